@@ -1,169 +1,201 @@
-import json
+from collections import namedtuple
+from datetime import date
 from telebot import TeleBot
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
-from datetime import datetime
-
-def load_data(filename='basa.json'):
-    try:
-        with open(filename, 'r', encoding='utf-8') as file:
-            data = json.load(file)
-            for key in ['students', 'activities', 'achievements', 'admins']:
-                data.setdefault(key, [])
-            return data
-    except FileNotFoundError:
-        return {'students': [], 'activities': [], 'achievements': [], 'admins': []}
-
-def save_data(data, filename='basa.json'):
-    with open(filename, 'w', encoding='utf-8') as file:
-        json.dump(data, file, ensure_ascii=False, indent=4)
+from aggregates import aggregates
+from data_manager import store, parse_event_date
+from exports import ExportFilter, event_rows, user_rows, parse_export_args, write_export
+from conversation_manager import conversation_step, next_step
+from keyboards import activities_keyboard
+from menus import get_menu, back_markup, reload_texts
+from navigation import show_screen
+from callback_codec import encode_callback, decode_callback, answer_expired
+from callback_router import router
+
+# Изменения, сделанные администраторами, записываются на диск сразу
+# (durable=True), даже если включена отложенная запись.
+
+STATS_SECTIONS = (
+    ('group', "По группам"),
+    ('level', "По уровню мероприятий"),
+    ('category', "По категориям мероприятий"),
+)
+
+def build_stats_report():
+    """
+    Собирает текст экрана статистики из предрасчитанных счётчиков.
+    """
+    parts = [
+        "Статистика подтверждённых достижений\n\n",
+        f"Ожидают подтверждения: мероприятий - {aggregates.pending_activities()}, "
+        f"достижений - {aggregates.pending_achievements()}\n",
+    ]
+    for dimension, title in STATS_SECTIONS:
+        parts.append(f"\n{title}:\n")
+        rows = aggregates.top(dimension)
+        if not rows:
+            parts.append("Нет данных.\n")
+        for value, count in rows:
+            parts.append(f" - {value}: {count}\n")
+    return "".join(parts).strip()
+
+PENDING_PAGE_SIZE = 8
+
+PendingTitle = namedtuple('PendingTitle', 'header empty')
+PENDING_TITLES = {
+    'events': PendingTitle("Неподтверждённые мероприятия", "Нет мероприятий, ожидающих подтверждения."),
+    'achievements': PendingTitle("Неподтверждённые достижения", "Нет достижений для подтверждения."),
+}
+
+EXPORT_HELP = (
+    "Выгрузка с фильтрами:\n"
+    "/export <events|users> [csv|xlsx] [from=ГГГГ-ММ-ДД] [to=ГГГГ-ММ-ДД] "
+    "[level=...] [category=...] [group=...]\n"
+    "Значения с пробелами берутся в кавычки: category=\"научная конференция\""
+)
+
+EXPORT_REPORTS = {
+    'events': (event_rows, "Выгрузка по мероприятиям"),
+    'users': (user_rows, "Выгрузка пользователей и их достижения"),
+}
 
 def setup_admin_handlers(bot: TeleBot):
     @bot.message_handler(commands=['admin'])
     def handle_admin_command(message):
-        data = load_data()
-        admins = {admin['telegram_id'] for admin in data.get('admins', [])}
+        if not store.is_admin(message.from_user.id):
+            bot.send_message(message.chat.id, "У вас нет прав администратора.")
+            return
 
-        if message.from_user.id not in admins:
+        menu = get_menu("admin")
+        bot.send_message(message.chat.id, menu.text, reply_markup=menu.markup)
+
+    @bot.message_handler(commands=['reload_texts'])
+    def handle_reload_texts(message):
+        if not store.is_admin(message.from_user.id):
             bot.send_message(message.chat.id, "У вас нет прав администратора.")
             return
 
-        send_admin_menu(message.chat.id)
+        try:
+            count = reload_texts()
+        except Exception as e:
+            bot.send_message(message.chat.id, f"Не удалось перечитать тексты: {e}")
+            return
+        bot.send_message(message.chat.id, f"Тексты обновлены, меню пересобрано: {count}.")
 
-    def send_admin_menu(chat_id):
-        markup = InlineKeyboardMarkup(row_width=1)
-        markup.add(
-            InlineKeyboardButton("Добавить администратора", callback_data="view_students:0"),
-            InlineKeyboardButton("Подтвердить мероприятия", callback_data="approve_events"),
-            InlineKeyboardButton("Подтвердить достижения студента", callback_data="approve_student_achievements"),
-            InlineKeyboardButton("Редактировать мероприятия", callback_data="edit_events"),
-            InlineKeyboardButton("Выгрузка по мероприятиям", callback_data="export_event_data"),
-            InlineKeyboardButton("Выгрузка пользователей и их достижения", callback_data="export_users_and_achievements"),
-        )
-        bot.send_message(chat_id, "Выберите действие:", reply_markup=markup)
+    def show_admin_menu(call, notice=None):
+        menu = get_menu("admin")
+        text = f"{notice}\n\n{menu.text}" if notice else menu.text
+        show_screen(bot, call, text, menu.markup)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("admin_back"))
+    @router.on("admin_back")
     def handle_admin_back(call):
         bot.answer_callback_query(call.id)
-        send_admin_menu(call.message.chat.id)
+        show_admin_menu(call)
+
+    def send_export(chat_id, report, export_format='csv', filters=ExportFilter()):
+        """
+        Отправляет отчёт файлом. Строки пишутся в файл по мере
+        обхода хранилища, файл закрывается после отправки.
+        """
+        make_rows, caption = EXPORT_REPORTS[report]
+        with write_export(make_rows(filters), export_format) as document:
+            bot.send_document(
+                chat_id, document,
+                caption=caption,
+                visible_file_name=f"{report}_{date.today():%Y%m%d}.{export_format}"
+            )
+
+    @router.on("admin_stats")
+    def admin_stats(call):
+        """
+        Экран статистики по группам, уровням и категориям.
+        """
+        if not store.is_admin(call.from_user.id):
+            bot.answer_callback_query(call.id, "У вас нет прав администратора.")
+            return
+        bot.answer_callback_query(call.id)
+        show_screen(bot, call, build_stats_report(), back_markup("admin_back"))
 
-    @bot.callback_query_handler(func=lambda call: call.data == "export_event_data")
+    @router.on("export_event_data")
     def export_event_data(call):
         """
         Выгрузка по мероприятиям с информацией об участниках.
         Добавлено отображение уровней и категорий.
         """
-        bot.answer_callback_query(call.id)
-        data = load_data()
-        events_text = "Отчет по мероприятиям с участниками:\n\n"
-
-        for event in data['activities']:
-            if event.get('confirmed', False):
-                events_text += (
-                    f"Название мероприятия: {event['title']}\n"
-                    f"Дата: {event['date']}\n"
-                    f"Место: {event['location']}\n"
-                    f"Уровень: {event.get('event_level', 'Не указан')}\n"
-                    f"Категория: {event.get('event_category', 'Не указана')}\n"
-                    "Участники и занятые места:\n"
-                )
-
-                participants = [
-                    ach for ach in data['achievements']
-                    if ach['event_id'] == event['id']
-                ]
-
-                if participants:
-                    for achievement in participants:
-                        student = next((s for s in data['students'] if s['telegram_id'] == achievement['student_id']), None)
-                        if student:
-                            events_text += (
-                                f"Имя: {student['first_name']} {student['last_name']}\n"
-                                f"Номер группы: {student['group_number']}\n"
-                                f"Занятое место: {achievement['place']}\n\n"
-                            )
-                else:
-                    events_text += "Нет зарегистрированных участников.\n\n"
+        bot.answer_callback_query(call.id, "Готовим файл...")
+        send_export(call.message.chat.id, 'events')
+        bot.send_message(call.message.chat.id, EXPORT_HELP)
 
-        markup = InlineKeyboardMarkup(row_width=1)
-        markup.add(InlineKeyboardButton("Назад", callback_data="admin_back"))
-        bot.send_message(call.message.chat.id, events_text.strip(), reply_markup=markup)
-
-    @bot.callback_query_handler(func=lambda call: call.data == "export_users_and_achievements")
+    @router.on("export_users_and_achievements")
     def export_users_and_achievements(call):
         """
         Выгрузка данных по пользователям и их достижениям.
         """
-        bot.answer_callback_query(call.id)
-        data = load_data()
-        users_text = "Отчет по пользователям и их достижениям:\n\n"
+        bot.answer_callback_query(call.id, "Готовим файл...")
+        send_export(call.message.chat.id, 'users')
+        bot.send_message(call.message.chat.id, EXPORT_HELP)
 
-        for student in data['students']:
-            users_text += (
-                f"Имя: {student['first_name']} {student['last_name']}\n"
-                f"Группа: {student['group_number']}\n"
-            )
-            achievements = [
-                ach for ach in data['achievements']
-                if ach['student_id'] == student['telegram_id']
-            ]
-
-            if achievements:
-                users_text += "Достижения:\n"
-                for achievement in achievements:
-                    event = next((evt for evt in data['activities'] if evt['id'] == achievement['event_id']), None)
-                    if event:
-                        users_text += (
-                            f" - Мероприятие: {event['title']}, место: {achievement['place']}\n"
-                        )
-            else:
-                users_text += "Достижения отсутствуют.\n"
+    @bot.message_handler(commands=['export'])
+    def handle_export_command(message):
+        if not store.is_admin(message.from_user.id):
+            bot.send_message(message.chat.id, "У вас нет прав администратора.")
+            return
 
-            users_text += "\n"
+        args = message.text.partition(' ')[2]
+        try:
+            report, export_format, filters = parse_export_args(args)
+        except ValueError as e:
+            bot.send_message(message.chat.id, f"Ошибка: {e}.\n\n{EXPORT_HELP}")
+            return
+        send_export(message.chat.id, report, export_format, filters)
 
-        markup = InlineKeyboardMarkup(row_width=1)
-        markup.add(InlineKeyboardButton("Назад", callback_data="admin_back"))
-        bot.send_message(call.message.chat.id, users_text.strip(), reply_markup=markup)
+    def future_events_keyboard(data):
+        """
+        Страница будущих мероприятий (подтверждённых и ожидающих
+        подтверждения) в порядке дат.
+        """
+        return activities_keyboard(
+            "future_page",
+            lambda event: InlineKeyboardButton(
+                f"{event['title']}", callback_data=encode_callback("view_event", event['id'])
+            ),
+            data, back_callback="admin_back", start=date.today(), confirmed=None
+        )
 
-    @bot.callback_query_handler(func=lambda call: call.data == "edit_events")
+    @router.on("edit_events")
+    @router.on_prefix("future_page:")
     def edit_events(call):
         """
         Отображает список будущих мероприятий для редактирования.
         """
-        data = load_data()
-        now = datetime.now()
-        future_events = []
-        for event in data.get('activities', []):
-            # Безопасная проверка даты
-            try:
-                event_date = datetime.strptime(event['date'], '%Y-%m-%d')
-                if event_date >= now:
-                    future_events.append(event)
-            except ValueError:
-                pass
-
-        if not future_events:
-            bot.send_message(call.message.chat.id, "Нет предстоящих мероприятий.")
+        page, markup = future_events_keyboard(call.data)
+        if not page.items:
+            show_screen(bot, call, "Нет предстоящих мероприятий.", back_markup("admin_back"))
             return
+        show_screen(bot, call, "Предстоящие мероприятия:", markup)
 
-        markup = InlineKeyboardMarkup(row_width=1)
-        for event in future_events:
-            markup.add(InlineKeyboardButton(
-                f"{event['title']}",
-                callback_data=f"view_event:{event['id']}"
-            ))
-        markup.add(InlineKeyboardButton("Назад", callback_data="admin_back"))
-
-        bot.send_message(call.message.chat.id, "Предстоящие мероприятия:", reply_markup=markup)
+    def show_future_events(chat_id):
+        """
+        Отправляет первую страницу списка будущих мероприятий.
+        """
+        page, markup = future_events_keyboard("edit_events")
+        if not page.items:
+            bot.send_message(chat_id, "Нет предстоящих мероприятий.")
+            return
+        bot.send_message(chat_id, "Предстоящие мероприятия:", reply_markup=markup)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("view_event"))
+    @router.on_prefix("view_event:")
     def view_event(call):
         """
         Просмотр выбранного мероприятия перед редактированием/удалением.
         """
-        data = load_data()
-        event_id = call.data.split(':')[1]
+        args = decode_callback(call.data)
+        if args is None:
+            answer_expired(bot, call)
+            return
+        event_id = args[0]
 
-        event = next((event for event in data['activities'] if event.get('id') == event_id), None)
+        event = store.get_activity(event_id)
 
         if event is None:
             bot.send_message(call.message.chat.id, "Ошибка: мероприятие не найдено.")
@@ -181,127 +213,147 @@ def setup_admin_handlers(bot: TeleBot):
 
         markup = InlineKeyboardMarkup(row_width=1)
         markup.add(
-            InlineKeyboardButton("Отредактировать", callback_data=f"edit_event:{event['id']}"),
-            InlineKeyboardButton("Удалить", callback_data=f"delete_event:{event['id']}"),
+            InlineKeyboardButton("Отредактировать", callback_data=encode_callback("edit_event", event['id'])),
+            InlineKeyboardButton("Удалить", callback_data=encode_callback("delete_event", event['id'])),
             InlineKeyboardButton("Назад", callback_data="edit_events")
         )
-        bot.send_message(call.message.chat.id, text.strip(), reply_markup=markup)
+        show_screen(bot, call, text.strip(), markup)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("edit_event"))
+    @router.on_prefix("edit_event:")
     def edit_event(call):
         """
         Запуск процесса редактирования мероприятия (по шагам).
         """
-        data = load_data()
-        event_id = call.data.split(':')[1]
+        args = decode_callback(call.data)
+        if args is None:
+            answer_expired(bot, call)
+            return
+        event_id = args[0]
 
-        event = next((event for event in data['activities'] if event.get('id') == event_id), None)
+        event = store.get_activity(event_id)
 
         if event is None:
             bot.send_message(call.message.chat.id, "Ошибка: мероприятие не найдено.")
             return
 
-        # Сохраняем event во временных переменных:
-        msg = bot.send_message(call.message.chat.id, "Введите новое название мероприятия:")
-        bot.register_next_step_handler(msg, get_new_description, event, call)
+        # Ответы сохраняются в состоянии диалога вместе с id мероприятия
+        show_screen(bot, call, "Введите новое название мероприятия:")
+        next_step(call.message.chat.id, get_new_description, event_id=event_id)
 
-    def get_new_description(message, event, call):
+    @conversation_step
+    def get_new_description(message, event_id):
         new_title = message.text.strip()
         msg = bot.send_message(message.chat.id, "Введите новое описание мероприятия:")
-        bot.register_next_step_handler(msg, get_new_date, event, new_title, call)
+        next_step(msg.chat.id, get_new_date, event_id=event_id, new_title=new_title)
 
-    def get_new_date(message, event, new_title, call):
+    @conversation_step
+    def get_new_date(message, event_id, new_title):
         new_description = message.text.strip()
         msg = bot.send_message(message.chat.id, "Введите новую дату (ГГГГ-ММ-ДД):")
-        bot.register_next_step_handler(msg, get_new_location, event, new_title, new_description, call)
+        next_step(
+            msg.chat.id, get_new_location,
+            event_id=event_id, new_title=new_title, new_description=new_description
+        )
 
-    def get_new_location(message, event, new_title, new_description, call):
+    @conversation_step
+    def get_new_location(message, event_id, new_title, new_description):
         new_date = message.text.strip()
         try:
-            datetime.strptime(new_date, '%Y-%m-%d')
+            parse_event_date(new_date)
         except ValueError:
             msg = bot.send_message(message.chat.id, "Неверный формат даты. Введите в формате ГГГГ-ММ-ДД:")
-            bot.register_next_step_handler(msg, get_new_location, event, new_title, new_description, call)
+            next_step(
+                msg.chat.id, get_new_location,
+                event_id=event_id, new_title=new_title, new_description=new_description
+            )
             return
 
         msg = bot.send_message(message.chat.id, "Введите новое место проведения мероприятия:")
-        bot.register_next_step_handler(msg, get_new_survey_link, event, new_title, new_description, new_date, call)
+        next_step(
+            msg.chat.id, get_new_survey_link,
+            event_id=event_id, new_title=new_title, new_description=new_description,
+            new_date=new_date
+        )
 
-    def get_new_survey_link(message, event, new_title, new_description, new_date, call):
+    @conversation_step
+    def get_new_survey_link(message, event_id, new_title, new_description, new_date):
         new_location = message.text.strip()
         msg = bot.send_message(message.chat.id, "Введите новую ссылку на опросник (может быть пусто):")
-        bot.register_next_step_handler(
-            msg, get_new_event_level,
-            event, new_title, new_description, new_date, new_location, call
+        next_step(
+            msg.chat.id, get_new_event_level,
+            event_id=event_id, new_title=new_title, new_description=new_description,
+            new_date=new_date, new_location=new_location
         )
 
-    def get_new_event_level(message, event, new_title, new_description, new_date, new_location, call):
+    @conversation_step
+    def get_new_event_level(message, event_id, new_title, new_description, new_date, new_location):
         new_survey_link = message.text.strip()
         msg = bot.send_message(message.chat.id, "Введите новый уровень мероприятия (локальный, региональный, всероссийский, международный):")
-        bot.register_next_step_handler(
-            msg, get_new_event_category,
-            event, new_title, new_description, new_date, new_location, new_survey_link, call
+        next_step(
+            msg.chat.id, get_new_event_category,
+            event_id=event_id, new_title=new_title, new_description=new_description,
+            new_date=new_date, new_location=new_location, new_survey_link=new_survey_link
         )
 
-    def get_new_event_category(message, event, new_title, new_description, new_date, new_location, new_survey_link, call):
+    @conversation_step
+    def get_new_event_category(message, event_id, new_title, new_description, new_date, new_location, new_survey_link):
         new_event_level = message.text.strip()
         msg = bot.send_message(message.chat.id, "Введите новую категорию мероприятия (научная конференция, олимпиада, спортивное и т. д.):")
-        bot.register_next_step_handler(
-            msg, update_event,
-            event, new_title, new_description, new_date, new_location, new_survey_link, new_event_level, call
+        next_step(
+            msg.chat.id, update_event,
+            event_id=event_id, new_title=new_title, new_description=new_description,
+            new_date=new_date, new_location=new_location, new_survey_link=new_survey_link,
+            new_event_level=new_event_level
         )
 
-    def update_event(message, event, new_title, new_description, new_date, new_location, new_survey_link, new_event_level, call):
+    @conversation_step
+    def update_event(message, event_id, new_title, new_description, new_date, new_location, new_survey_link, new_event_level):
         new_event_category = message.text.strip()
 
-        data = load_data()
-        for idx, existing_event in enumerate(data['activities']):
-            if existing_event['id'] == event['id']:
-                data['activities'][idx]['title'] = new_title
-                data['activities'][idx]['description'] = new_description
-                data['activities'][idx]['date'] = new_date
-                data['activities'][idx]['location'] = new_location
-                data['activities'][idx]['survey_link'] = new_survey_link
-                data['activities'][idx]['event_level'] = new_event_level
-                data['activities'][idx]['event_category'] = new_event_category
-                break
-
-        save_data(data)
+        store.update_activity(
+            event_id,
+            title=new_title,
+            description=new_description,
+            date=new_date,
+            location=new_location,
+            survey_link=new_survey_link,
+            event_level=new_event_level,
+            event_category=new_event_category,
+            durable=True
+        )
 
         bot.send_message(message.chat.id, "Мероприятие успешно обновлено.")
-        edit_events(call)
+        show_future_events(message.chat.id)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("delete_event"))
+    @router.on_prefix("delete_event:")
     def delete_event(call):
         """
         Удаляет выбранное мероприятие.
         """
-        data = load_data()
-        event_id = call.data.split(':')[1]
-
-        data['activities'] = [
-            event for event in data['activities'] if event['id'] != event_id
-        ]
+        args = decode_callback(call.data)
+        if args is None:
+            answer_expired(bot, call)
+            return
+        event_id = args[0]
 
-        save_data(data)
-        bot.send_message(call.message.chat.id, "Мероприятие удалено.")
+        store.delete_activity(event_id, durable=True)
+        bot.answer_callback_query(call.id, "Мероприятие удалено.")
         edit_events(call)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("view_students"))
+    @router.on_prefix("view_students:")
     def view_students_callback(call):
-        data = load_data()
-        students = data.get('students', [])
+        students = store.students
         page = int(call.data.split(':')[1])
-        display_student_buttons(call.message.chat.id, page, bot, students)
+        display_student_buttons(call, page, students)
 
-    def display_student_buttons(chat_id, page, bot, students):
+    def display_student_buttons(call, page, students):
         items_per_page = 3
         start = page * items_per_page
         end = start + items_per_page
         student_slice = students[start:end]
 
         if not student_slice:
-            bot.send_message(chat_id, "Студенты закончились или страница пуста.")
+            show_screen(bot, call, "Студенты закончились или страница пуста.", back_markup("admin_back"))
             return
 
         markup = InlineKeyboardMarkup(row_width=1)
@@ -321,12 +373,11 @@ def setup_admin_handlers(bot: TeleBot):
 
         markup.add(*nav_buttons)
         markup.add(InlineKeyboardButton("Назад", callback_data="admin_back"))
-        bot.send_message(chat_id, "Выберите студента для добавления в администраторы:", reply_markup=markup)
+        show_screen(bot, call, "Выберите студента для добавления в администраторы:", markup)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("select_student"))
+    @router.on_prefix("select_student:")
     def select_student(call):
-        data = load_data()
-        students = data.get('students', [])
+        students = store.students
         _, index_on_page, _ = call.data.split(':')
         index_on_page = int(index_on_page) - 1
 
@@ -338,7 +389,7 @@ def setup_admin_handlers(bot: TeleBot):
 
         markup = InlineKeyboardMarkup(row_width=2)
         markup.add(
-            InlineKeyboardButton("✅ Да", callback_data=f"confirm_add:{selected_student['telegram_id']}"),
+            InlineKeyboardButton("✅ Да", callback_data=encode_callback("confirm_add", selected_student['telegram_id'])),
             InlineKeyboardButton("❌ Нет", callback_data="admin_back")
         )
 
@@ -346,14 +397,17 @@ def setup_admin_handlers(bot: TeleBot):
             f"Сделать {selected_student['last_name']} {selected_student['first_name']} "
             f"администратором?"
         )
-        bot.send_message(call.message.chat.id, text, reply_markup=markup)
+        show_screen(bot, call, text, markup)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("confirm_add"))
+    @router.on_prefix("confirm_add:")
     def confirm_add_admin(call):
-        data = load_data()
-        selected_telegram_id = call.data.split(':')[1]
+        args = decode_callback(call.data)
+        if args is None:
+            answer_expired(bot, call)
+            return
+        selected_telegram_id = args[0]
 
-        student = next((s for s in data['students'] if str(s['telegram_id']) == selected_telegram_id), None)
+        student = store.get_student(selected_telegram_id)
 
         if not student:
             bot.send_message(call.message.chat.id, "Ошибка: студент не найден.")
@@ -366,57 +420,138 @@ def setup_admin_handlers(bot: TeleBot):
             "group_number": student['group_number']
         }
 
-        already_admins = {admin['telegram_id'] for admin in data['admins']}
-        if str(new_admin['telegram_id']) in map(str, already_admins):
-            text = f"{new_admin['last_name']} {new_admin['first_name']} уже является администратором."
-        else:
-            data['admins'].append(new_admin)
-            save_data(data)
-            text = (
-                f"Вы сделали {new_admin['last_name']} {new_admin['first_name']} "
-                f"администратором."
-            )
+        with store.transaction(durable=True) as tx:
+            if store.is_admin(new_admin['telegram_id']):
+                text = f"{new_admin['last_name']} {new_admin['first_name']} уже является администратором."
+            else:
+                tx.add_admin(new_admin)
+                text = (
+                    f"Вы сделали {new_admin['last_name']} {new_admin['first_name']} "
+                    f"администратором."
+                )
 
-        bot.send_message(call.message.chat.id, text)
-        send_admin_menu(call.message.chat.id)
+        show_admin_menu(call, text)
 
-    @bot.callback_query_handler(func=lambda call: call.data == "approve_events")
-    def approve_events(call):
+    def pending_item(kind, record):
         """
-        Список неподтверждённых мероприятий для подтверждения.
+        Возвращает (строку списка, надпись кнопки, callback_data просмотра)
+        для записи очереди подтверждения.
         """
-        data = load_data()
-        unconfirmed_events = [
-            event for event in data.get('activities', []) if not event.get('confirmed', False)
-        ]
+        if kind == 'events':
+            return (
+                f"{record['title']} ({record['date']})",
+                record['title'],
+                encode_callback("review_event", record['id']),
+            )
+        student = store.get_student(record['student_id']) or {}
+        event = store.get_activity(record['event_id']) or {}
+        name = f"{student.get('last_name', '')} {student.get('first_name', '')}".strip() \
+            or f"ID {record['student_id']}"
+        return (
+            f"{name} - {event.get('title', 'Мероприятие не найдено')}, место: {record['place']}",
+            f"{name} - {record['place']}",
+            encode_callback("review_ach", record['student_id'], record['event_id']),
+        )
 
-        if not unconfirmed_events:
-            bot.send_message(call.message.chat.id, "Нет мероприятий, ожидающих подтверждения.")
+    def show_pending_queue(call, kind, offset=0, selected=()):
+        """
+        Страница очереди подтверждения в порядке поступления.
+        Нажатие на запись отмечает её, 🔍 открывает карточку;
+        отмеченные или все записи страницы подтверждаются одной транзакцией.
+        """
+        pending_activities, pending_achievements = store.pending_count()
+        total = pending_activities if kind == 'events' else pending_achievements
+        title = PENDING_TITLES[kind]
+        if total == 0:
+            show_screen(bot, call, title.empty, back_markup("admin_back"))
             return
+        # После подтверждения очередь короче - остаёмся в её пределах
+        offset = min(offset, (total - 1) // PENDING_PAGE_SIZE * PENDING_PAGE_SIZE)
+        get_page = store.pending_activities if kind == 'events' else store.pending_achievements
+        records = get_page(offset, PENDING_PAGE_SIZE)
+        page_ids = tuple(record['id'] for record in records)
+        selected = tuple(record_id for record_id in page_ids if record_id in selected)
+
+        lines = [f"{title.header} (всего {total}):"]
+        markup = InlineKeyboardMarkup()
+        for number, record in enumerate(records, start=offset + 1):
+            line, label, review_callback = pending_item(kind, record)
+            lines.append(f"{number}. {line}")
+            toggled = tuple(record_id for record_id in page_ids
+                            if (record_id in selected) != (record_id == record['id']))
+            mark = "☑️" if record['id'] in selected else "⬜"
+            markup.row(
+                InlineKeyboardButton(f"{mark} {label}", callback_data=encode_callback("pending", kind, offset, toggled)),
+                InlineKeyboardButton("🔍", callback_data=review_callback),
+            )
 
-        event_list_text = "Неподтверждённые мероприятия:\n" + "\n".join(
-            [f"{index + 1}. {event['title']}" for index, event in enumerate(unconfirmed_events)]
-        )
-
-        markup = InlineKeyboardMarkup(row_width=1)
-        for event in unconfirmed_events:
-            markup.add(InlineKeyboardButton(
-                f"{event['title']}",
-                callback_data=f"review_event:{event['id']}"
+        nav_buttons = []
+        if offset > 0:
+            nav_buttons.append(InlineKeyboardButton(
+                "⬅️ Назад", callback_data=encode_callback("pending", kind, offset - PENDING_PAGE_SIZE, ())
             ))
-        markup.add(InlineKeyboardButton("Назад", callback_data="admin_back"))
+        if offset + PENDING_PAGE_SIZE < total:
+            nav_buttons.append(InlineKeyboardButton(
+                "➡️ Вперёд", callback_data=encode_callback("pending", kind, offset + PENDING_PAGE_SIZE, ())
+            ))
+        markup.row(*nav_buttons)
+        if selected:
+            markup.row(InlineKeyboardButton(
+                f"✅ Подтвердить выбранные ({len(selected)})",
+                callback_data=encode_callback("pending_approve", kind, offset, selected)
+            ))
+        markup.row(InlineKeyboardButton(
+            "✅ Подтвердить все на странице",
+            callback_data=encode_callback("pending_approve", kind, offset, page_ids)
+        ))
+        markup.row(InlineKeyboardButton("Назад", callback_data="admin_back"))
+        show_screen(bot, call, "\n".join(lines), markup)
+
+    @router.on("approve_events")
+    def approve_events(call):
+        """
+        Очередь неподтверждённых мероприятий.
+        """
+        show_pending_queue(call, 'events')
 
-        bot.send_message(call.message.chat.id, event_list_text, reply_markup=markup)
+    @router.on_prefix("pending:")
+    def handle_pending_page(call):
+        args = decode_callback(call.data)
+        if args is None:
+            answer_expired(bot, call)
+            return
+        bot.answer_callback_query(call.id)
+        show_pending_queue(call, *args)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("review_event"))
+    @router.on_prefix("pending_approve:")
+    def approve_pending(call):
+        """
+        Подтверждает пачку записей очереди одной транзакцией.
+        """
+        args = decode_callback(call.data)
+        if args is None:
+            answer_expired(bot, call)
+            return
+        kind, offset, record_ids = args
+        if kind == 'events':
+            confirmed = store.confirm_pending(activity_ids=record_ids, durable=True)
+        else:
+            confirmed = store.confirm_pending(achievement_ids=record_ids, durable=True)
+        bot.answer_callback_query(call.id, f"Подтверждено: {confirmed}.")
+        show_pending_queue(call, kind, offset)
+
+    @router.on_prefix("review_event:")
     def review_event(call):
         """
         Просмотр неподтверждённого мероприятия, с опцией подтвердить/отклонить/отредактировать.
         """
-        data = load_data()
-        event_id = call.data.split(':')[1]
+        args = decode_callback(call.data)
+        if args is None:
+            answer_expired(bot, call)
+            return
+        event_id = args[0]
 
-        event = next((event for event in data['activities'] if event.get('id') == event_id), None)
+        event = store.get_activity(event_id)
 
         if event is None:
             bot.send_message(call.message.chat.id, "Ошибка: мероприятие не найдено.")
@@ -434,95 +569,60 @@ def setup_admin_handlers(bot: TeleBot):
 
         markup = InlineKeyboardMarkup(row_width=1)
         markup.add(
-            InlineKeyboardButton("Подтвердить", callback_data=f"confirm_event:{event['id']}"),
-            InlineKeyboardButton("Отклонить", callback_data=f"deny_event:{event['id']}"),
-            InlineKeyboardButton("Редактировать", callback_data=f"edit_event:{event['id']}"),
+            InlineKeyboardButton("Подтвердить", callback_data=encode_callback("confirm_event", event['id'])),
+            InlineKeyboardButton("Отклонить", callback_data=encode_callback("deny_event", event['id'])),
+            InlineKeyboardButton("Редактировать", callback_data=encode_callback("edit_event", event['id'])),
             InlineKeyboardButton("Назад", callback_data="approve_events")
         )
-        bot.send_message(call.message.chat.id, text.strip(), reply_markup=markup)
+        show_screen(bot, call, text.strip(), markup)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("confirm_event"))
+    @router.on_prefix("confirm_event:")
     def confirm_event(call):
-        data = load_data()
-        event_id = call.data.split(':')[1]
+        args = decode_callback(call.data)
+        if args is None:
+            answer_expired(bot, call)
+            return
+        event_id = args[0]
 
-        for event in data['activities']:
-            if event.get('id') == event_id:
-                event['confirmed'] = True
-                save_data(data)
-                bot.send_message(call.message.chat.id, "Мероприятие подтверждено.")
-                approve_events(call)
-                return
+        if store.update_activity(event_id, confirmed=True, durable=True) is not None:
+            bot.answer_callback_query(call.id, "Мероприятие подтверждено.")
+            approve_events(call)
+            return
 
-        bot.send_message(call.message.chat.id, "Ошибка: мероприятие не найдено.")
-        handle_admin_back(call)
+        bot.answer_callback_query(call.id, "Ошибка: мероприятие не найдено.")
+        show_admin_menu(call)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("deny_event"))
+    @router.on_prefix("deny_event:")
     def deny_event(call):
-        data = load_data()
-        event_id = call.data.split(':')[1]
-
-        data['activities'] = [
-            event for event in data['activities'] if event['id'] != event_id
-        ]
+        args = decode_callback(call.data)
+        if args is None:
+            answer_expired(bot, call)
+            return
+        event_id = args[0]
 
-        save_data(data)
-        bot.send_message(call.message.chat.id, "Мероприятие отклонено.")
+        store.delete_activity(event_id, durable=True)
+        bot.answer_callback_query(call.id, "Мероприятие отклонено.")
         approve_events(call)
 
-    @bot.callback_query_handler(func=lambda call: call.data == "approve_student_achievements")
+    @router.on("approve_student_achievements")
     def approve_student_achievements(call):
         """
-        Список неподтверждённых достижений студентов.
+        Очередь неподтверждённых достижений студентов.
         """
-        data = load_data()
-
-        unconfirmed_achievements = [
-            ach for ach in data.get('achievements', []) if not ach.get('confirmed', False)
-        ]
-
-        if not unconfirmed_achievements:
-            bot.send_message(call.message.chat.id, "Нет достижений для подтверждения.")
-            return
-
-        event_dict = {event['id']: event['title'] for event in data.get('activities', [])}
+        show_pending_queue(call, 'achievements')
 
-        achievement_list_text = "Неподтверждённые достижения:\n"
-        for index, ach in enumerate(unconfirmed_achievements, start=1):
-            event_title = event_dict.get(ach['event_id'], "Мероприятие не найдено")
-            achievement_list_text += (
-                f"{index}. Студент ID {ach['student_id']} на мероприятии "
-                f"{event_title} занял {ach['place']}\n"
-            )
-
-        markup = InlineKeyboardMarkup(row_width=1)
-        for ach in unconfirmed_achievements:
-            student_id = ach['student_id']
-            event_id = ach['event_id']
-            callback_data = f"review_ach:{student_id},{event_id}"
-
-            # Ограничение на длину callback_data (64 символа). Обычно хватает.
-            if len(callback_data) <= 64:
-                markup.add(InlineKeyboardButton(
-                    f"Участник ID: {student_id} - {ach['place']}",
-                    callback_data=callback_data
-                ))
-        markup.add(InlineKeyboardButton("Назад", callback_data="admin_back"))
-
-        bot.send_message(call.message.chat.id, achievement_list_text, reply_markup=markup)
-
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("review_ach"))
+    @router.on_prefix("review_ach:")
     def review_achievement(call):
-        data = load_data()
-        student_id, event_id = call.data.split(':')[1].split(',')
-        student_id, event_id = str(student_id), str(event_id)
+        args = decode_callback(call.data)
+        if args is None:
+            answer_expired(bot, call)
+            return
+        student_id, event_id = args
 
-        achievement = next((ach for ach in data['achievements']
-                            if str(ach['student_id']) == student_id and str(ach['event_id']) == event_id), None)
+        achievement = store.get_achievement(student_id, event_id)
 
         if achievement is None:
             bot.send_message(call.message.chat.id, "Ошибка: достижение не найдено.")
-            print(f"DEBUG: student_id={student_id}, event_id={event_id}, achievements={data['achievements']}")
             return
 
         text = (
@@ -532,33 +632,30 @@ def setup_admin_handlers(bot: TeleBot):
         )
 
         markup = InlineKeyboardMarkup(row_width=1)
-        confirm_callback = f"confirm_ach:{student_id},{event_id}"
-
-        if len(confirm_callback) <= 64:
-            markup.add(
-                InlineKeyboardButton("✅ Подтвердить", callback_data=confirm_callback),
-            )
+        markup.add(
+            InlineKeyboardButton("✅ Подтвердить", callback_data=encode_callback("confirm_ach", student_id, event_id)),
+        )
 
         markup.add(
             InlineKeyboardButton("❌ Отклонить", callback_data="cancel_action")
         )
 
-        bot.send_message(call.message.chat.id, text, reply_markup=markup)
+        show_screen(bot, call, text, markup)
 
-    @bot.callback_query_handler(func=lambda call: call.data.startswith("confirm_ach"))
+    @router.on_prefix("confirm_ach:")
     def confirm_achievement(call):
         """
         Подтверждение достижения студента.
         """
-        data = load_data()
-        student_id, event_id = call.data.split(':')[1].split(',')
-        student_id, event_id = str(student_id), str(event_id)
+        args = decode_callback(call.data)
+        if args is None:
+            answer_expired(bot, call)
+            return
+        student_id, event_id = args
 
-        for ach in data['achievements']:
-            if str(ach['student_id']) == student_id and str(ach['event_id']) == event_id:
-                ach['confirmed'] = True
-                save_data(data)
-                bot.send_message(call.message.chat.id, "Достижение успешно подтверждено!")
-                return
+        if store.update_achievement(student_id, event_id, confirmed=True, durable=True) is not None:
+            bot.answer_callback_query(call.id, "Достижение успешно подтверждено!")
+            approve_student_achievements(call)
+            return
 
         bot.send_message(call.message.chat.id, "Ошибка: достижение не найдено.")
@@ -0,0 +1,148 @@
+# aggregates.py
+"""
+Модуль с предрасчитанными счётчиками для статистики.
+Счётчики подписаны на изменения хранилища (DataStore.add_listener)
+и обновляются на каждой операции, поэтому экраны статистики читают
+готовые числа, а не перебирают достижения, мероприятия и студентов.
+
+Для каждого достижения и мероприятия запоминается, в какие счётчики
+оно внесло вклад. При изменении записи старый вклад вычитается
+и добавляется новый; при изменении мероприятия или студента так же
+пересчитываются их достижения.
+"""
+
+from collections import Counter
+
+from data_manager import store, parse_place
+
+PODIUM_PLACES = (1, 2, 3)
+NOT_SPECIFIED = "не указано"
+
+# Измерения счётчиков
+DIMENSIONS = (
+    'group',          # подтверждённые достижения по группам
+    'level',          # ... по уровню мероприятия
+    'category',       # ... по категории мероприятия
+    'student',        # ... по студентам
+    'podium',         # призовые места: (id студента, место) -> число
+    'student_pending',  # достижения студента на проверке
+    'pending',        # очередь подтверждения: 'achievements' / 'activities'
+)
+
+
+def _label(value):
+    return str(value or '').strip().lower() or NOT_SPECIFIED
+
+
+def _group_label(value):
+    # Номера групп пишут то строчными, то прописными буквами
+    return str(value or '').strip().upper() or NOT_SPECIFIED
+
+
+class Aggregates:
+    """
+    Счётчики статистики, обновляемые вместе с хранилищем.
+    Чтение - O(1), без блокировок.
+    """
+
+    def __init__(self):
+        self.store = None
+        self.counters = {dimension: Counter() for dimension in DIMENSIONS}
+        self._contributions = {}  # (вид, id записи) -> ключи счётчиков
+
+    # --- Подписка на хранилище ---
+
+    def rebuild(self, store):
+        self.store = store
+        self.counters = {dimension: Counter() for dimension in DIMENSIONS}
+        self._contributions = {}
+        for activity in store.activities:
+            if 'id' in activity:
+                self._refresh('activity', activity['id'], activity)
+        for achievement in store.achievements:
+            self._refresh('achievement', achievement['id'], achievement)
+
+    def changed(self, kind, key, record):
+        if kind == 'achievement':
+            self._refresh('achievement', key, record)
+        elif kind == 'activity':
+            self._refresh('activity', key, record)
+            for achievement in self.store.achievements_for_event(key):
+                self._refresh('achievement', achievement['id'], achievement)
+        elif kind == 'student':
+            for achievement in self.store.achievements_for_student(key):
+                self._refresh('achievement', achievement['id'], achievement)
+
+    def _refresh(self, kind, key, record):
+        for dimension, counter_key in self._contributions.pop((kind, key), ()):
+            counter = self.counters[dimension]
+            counter[counter_key] -= 1
+            if counter[counter_key] <= 0:
+                del counter[counter_key]
+        if record is None:
+            return
+        keys = self._activity_keys(record) if kind == 'activity' else self._achievement_keys(record)
+        for dimension, counter_key in keys:
+            self.counters[dimension][counter_key] += 1
+        if keys:
+            self._contributions[(kind, key)] = keys
+
+    @staticmethod
+    def _activity_keys(activity):
+        if activity.get('confirmed', False):
+            return ()
+        return (('pending', 'activities'),)
+
+    def _achievement_keys(self, achievement):
+        student_id = str(achievement['student_id'])
+        if not achievement.get('confirmed', False):
+            return (('pending', 'achievements'), ('student_pending', student_id))
+        event = self.store.get_activity(achievement['event_id'])
+        student = self.store.get_student(student_id)
+        if event is None or student is None:
+            # Как и в отчётах, достижения удалённых мероприятий не считаются
+            return ()
+        keys = (
+            ('student', student_id),
+            ('group', _group_label(student.get('group_number'))),
+            ('level', _label(event.get('event_level'))),
+            ('category', _label(event.get('event_category'))),
+        )
+        place = parse_place(achievement.get('place'))
+        if place in PODIUM_PLACES:
+            keys += (('podium', (student_id, place)),)
+        return keys
+
+    # --- Чтение ---
+
+    def top(self, dimension):
+        """
+        Пары (значение, число подтверждённых достижений) по убыванию.
+        dimension - 'group', 'level' или 'category'.
+        """
+        # dict.copy выполняется целиком под GIL, поэтому копия согласована,
+        # даже если в этот момент поток записи меняет счётчик
+        counts = dict.copy(self.counters[dimension])
+        return sorted(counts.items(), key=lambda item: item[1], reverse=True)
+
+    def pending_achievements(self):
+        return self.counters['pending']['achievements']
+
+    def pending_activities(self):
+        return self.counters['pending']['activities']
+
+    def student_summary(self, student_id):
+        """
+        Сводка студента: (подтверждено, на проверке, {место: число}).
+        """
+        student_id = str(student_id)
+        podium = self.counters['podium']
+        return (
+            self.counters['student'][student_id],
+            self.counters['student_pending'][student_id],
+            {place: podium[(student_id, place)] for place in PODIUM_PLACES},
+        )
+
+
+aggregates = Aggregates()
+store.add_listener(aggregates)
@@ -5,11 +5,29 @@
 """
 
 import telebot
-from config import TOKEN
+from config import TOKEN, BOT_NUM_THREADS, DISPATCHER_LANE_DEPTH, PDF_WORKERS, PDF_QUEUE_SIZE
 from admin import setup_admin_handlers
+from callback_router import setup_callback_router
+from conversation_manager import setup_conversation_router
+from dispatcher import install
+from pdf_reports import PdfRenderer
 
 # Создаем экземпляр бота
-bot = telebot.TeleBot(TOKEN)
+# Хранилище данных потокобезопасно (см. DataStore.transaction),
+# поэтому обработчики можно выполнять в нескольких потоках.
+# Пул потоков TeleBot не сохраняет порядок сообщений одного чата,
+# поэтому хендлеры выполняют полосы диспетчера (см. dispatcher.py).
+bot = telebot.TeleBot(TOKEN, threaded=False)
+dispatcher = install(bot, BOT_NUM_THREADS, DISPATCHER_LANE_DEPTH)
+
+# PDF-отчёты рисуются в отдельных процессах (см. pdf_reports.py)
+pdf_renderer = PdfRenderer(bot, PDF_WORKERS, PDF_QUEUE_SIZE)
+
+# Ответы в пошаговых диалогах обрабатываются раньше остальных хендлеров
+setup_conversation_router(bot)
+
+# Нажатия inline-кнопок разбирает маршрутизатор (см. callback_router.py)
+setup_callback_router(bot)
 
 # Настраиваем админские обработчики
 setup_admin_handlers(bot)
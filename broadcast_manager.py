@@ -0,0 +1,189 @@
+# broadcast_manager.py
+"""
+Модуль для массовой рассылки сообщений.
+Отправка идёт из ограниченного пула потоков с учётом лимитов Telegram:
+общего (около 30 сообщений в секунду) и на один чат (1 сообщение в секунду).
+Ответ 429 выдерживает паузу retry_after для всей рассылки, сетевые ошибки
+и ошибки сервера повторяются с экспоненциальной задержкой.
+Ошибки, означающие, что получатель недоступен навсегда, распознаёт
+classify_error.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from telebot.apihelper import ApiTelegramException
+
+from config import BROADCAST_WORKERS, BROADCAST_RATE, BROADCAST_PER_CHAT_RATE
+
+
+# Причины недоступности получателя (значения поля delivery_status студента)
+DELIVERY_BLOCKED = 'blocked'
+DELIVERY_NOT_FOUND = 'not_found'
+DELIVERY_DEACTIVATED = 'deactivated'
+
+def classify_error(error):
+    """
+    Определяет, означает ли ошибка отправки, что получатель недоступен.
+    Возвращает причину недоступности или None для временных
+    и прочих ошибок.
+    """
+    if not isinstance(error, ApiTelegramException):
+        return None
+    description = error.description.lower()
+    if error.error_code == 403:
+        if 'deactivated' in description:
+            return DELIVERY_DEACTIVATED
+        return DELIVERY_BLOCKED
+    if error.error_code == 400 and 'chat not found' in description:
+        return DELIVERY_NOT_FOUND
+    return None
+
+
+class TokenBucket:
+    """
+    Потокобезопасный ограничитель частоты «ведро с токенами».
+    rate - токенов в секунду, capacity - сколько токенов может накопиться,
+    initial - сколько токенов в ведре сразу (по умолчанию полное).
+    """
+
+    def __init__(self, rate, capacity=1, initial=None):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity if initial is None else initial
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Забирает один токен, при необходимости дожидаясь его.
+        """
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """
+        Запрещает выдачу токенов на заданное время (ответ 429 от Telegram).
+        """
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+class BroadcastResult:
+    """
+    Итог рассылки: число отправленных сообщений и ошибки по чатам.
+    """
+
+    def __init__(self, total):
+        self.total = total
+        self.sent = 0
+        self.failed = {}
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.sent + len(self.failed)
+
+    def record(self, chat_id, error=None):
+        with self._lock:
+            if error is None:
+                self.sent += 1
+            else:
+                self.failed[chat_id] = error
+            return self.done
+
+
+class Broadcaster:
+    """
+    Рассылает сообщения параллельно, не превышая лимиты Telegram.
+    """
+
+    def __init__(self, bot, workers=BROADCAST_WORKERS, rate=BROADCAST_RATE,
+                 per_chat_rate=BROADCAST_PER_CHAT_RATE, max_retries=3):
+        self.bot = bot
+        self.workers = workers
+        self.per_chat_rate = per_chat_rate
+        self.max_retries = max_retries
+        # Пустое ведро на один токен: ни в одну секунду, включая первую,
+        # не уходит больше rate сообщений
+        self.global_bucket = TokenBucket(rate, initial=0)
+        self._chat_buckets = {}
+        self._chat_buckets_lock = threading.Lock()
+
+    def _chat_bucket(self, chat_id):
+        with self._chat_buckets_lock:
+            bucket = self._chat_buckets.get(chat_id)
+            if bucket is None:
+                bucket = self._chat_buckets[chat_id] = TokenBucket(self.per_chat_rate)
+            return bucket
+
+    def send(self, chat_id, text, **kwargs):
+        """
+        Отправляет одно сообщение с учётом лимитов и повторами.
+        Ошибки, которые не лечатся повтором, пробрасываются.
+        """
+        attempt = 0
+        while True:
+            self._chat_bucket(chat_id).acquire()
+            self.global_bucket.acquire()
+            try:
+                return self.bot.send_message(chat_id, text, **kwargs)
+            except ApiTelegramException as e:
+                if attempt >= self.max_retries:
+                    raise
+                if e.error_code == 429:
+                    retry_after = e.result_json.get('parameters', {}).get('retry_after', 1)
+                    # Лимит превышен для всего бота - притормаживаем всю рассылку
+                    self.global_bucket.pause(retry_after)
+                elif e.error_code >= 500:
+                    time.sleep(2 ** attempt)
+                else:
+                    raise
+            except requests.exceptions.RequestException:
+                if attempt >= self.max_retries:
+                    raise
+                time.sleep(2 ** attempt)
+            attempt += 1
+
+    def broadcast(self, messages, progress=None):
+        """
+        Рассылает сообщения из списка пар (chat_id, text).
+        progress(done, total) вызывается после каждого сообщения.
+        Возвращает BroadcastResult.
+        """
+        messages = list(messages)
+        result = BroadcastResult(len(messages))
+
+        def deliver(chat_id, text):
+            try:
+                self.send(chat_id, text)
+                done = result.record(chat_id)
+            except Exception as e:
+                done = result.record(chat_id, e)
+            if progress is not None:
+                progress(done, result.total)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for chat_id, text in messages:
+                executor.submit(deliver, chat_id, text)
+
+        return result
+
+def log_progress(done, total, every=100):
+    """
+    Печатает прогресс рассылки каждые every сообщений и в конце.
+    """
+    if done % every == 0 or done == total:
+        print(f"Рассылка: {done}/{total}")
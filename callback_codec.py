@@ -0,0 +1,235 @@
+# callback_codec.py
+"""
+Модуль для компактной callback_data кнопок.
+Telegram ограничивает callback_data 64 байтами, а id мероприятий (UUID)
+и пары студент/мероприятие в неё едва помещаются или не помещаются вовсе.
+Вместо самих данных в кнопку кладётся "<действие>:<токен>", где токен -
+короткий ключ записи в таблице на стороне бота. Запись хранит аргументы
+действия и живёт CALLBACK_TTL секунд с последнего использования.
+
+    markup.add(InlineKeyboardButton("Открыть", callback_data=encode_callback("view_event", event_id)))
+    ...
+    args = decode_callback(call.data)   # (event_id,) или None
+
+Таблица токенов сохраняется в файл CALLBACKS_FILENAME (снимок с журналом,
+как у состояния диалогов), поэтому кнопки старых сообщений работают и после
+перезапуска бота, пока не истёк их TTL. Журнал дописывается без fsync:
+при сбое питания могут пропасть только последние выданные токены.
+Аргументы действий - строки, числа, даты и кортежи из них.
+"""
+
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import date
+
+from config import CALLBACKS_FILENAME, CALLBACK_TTL, CALLBACK_TABLE_SIZE
+from data_manager import JsonStateBackend, JOURNAL_COMPACT_EVERY
+
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ'
+
+
+def to_base62(number):
+    """
+    Записывает неотрицательное число в 62-ричной системе.
+    """
+    digits = []
+    while True:
+        number, digit = divmod(number, len(ALPHABET))
+        digits.append(ALPHABET[digit])
+        if number == 0:
+            return ''.join(reversed(digits))
+
+
+def _dump_args(value):
+    """
+    Переводит аргументы действия в JSON: кортежи - в списки, даты - в {"date": ...}.
+    """
+    if isinstance(value, tuple):
+        return [_dump_args(item) for item in value]
+    if isinstance(value, date):
+        return {'date': value.isoformat()}
+    return value
+
+
+def _load_args(value):
+    """
+    Обратное преобразование к _dump_args.
+    """
+    if isinstance(value, list):
+        return tuple(_load_args(item) for item in value)
+    if isinstance(value, dict):
+        return date.fromisoformat(value['date'])
+    return value
+
+
+class CallbackTable:
+    """
+    Потокобезопасная таблица токенов callback_data с TTL.
+    Одинаковые действие и аргументы получают один и тот же токен,
+    поэтому перерисовка клавиатур не раздувает таблицу.
+    Сверх max_size вытесняются давно не использованные записи.
+    Если задан filename, новые токены дописываются в журнал, а продление
+    срока - не чаще раза в половину TTL на токен.
+    """
+
+    def __init__(self, filename=None, ttl=CALLBACK_TTL, max_size=CALLBACK_TABLE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        # Префикс токенов; хранится в файле, чтобы токены не повторялись
+        self._epoch = to_base62(random.getrandbits(24))
+        self._issued = 0  # число выданных токенов
+        # токен -> (действие, аргументы, срок, срок, записанный в файл)
+        self._records = OrderedDict()
+        self._tokens = {}  # (действие, аргументы) -> токен
+        self._lock = threading.Lock()
+        self.backend = JsonStateBackend(filename) if filename else None
+        if self.backend is not None:
+            # Потеря последних токенов при сбое питания допустима
+            self.backend.sync = False
+            self._load()
+
+    def _load(self):
+        """
+        Загружает снимок и журнал, отбрасывает устаревшие токены
+        и сворачивает журнал в новый снимок.
+        """
+        state, entries = self.backend.load()
+        self._epoch = state.get('epoch', self._epoch)
+        self._issued = state.get('counter', 0)
+        records = [tuple(record) for record in state.get('records', [])]
+        for entry in entries:
+            records.append((entry['token'], entry['action'], entry['args'], entry['expires']))
+            self._issued = max(self._issued, entry.get('counter', 0))
+
+        now = time.time()
+        for token, action, args, expires in records:
+            self._records.pop(token, None)
+            if expires >= now:
+                self._records[token] = (action, _load_args(args), expires, expires)
+        while len(self._records) > self.max_size:
+            self._records.popitem(last=False)
+        self._tokens = {(action, args): token for token, (action, args, _, _) in self._records.items()}
+        self._compact()
+
+    def _compact(self):
+        """
+        Сохраняет снимок таблицы. Журнал сворачивается, когда дорастает
+        до размера таблицы, поэтому запись снимка окупается.
+        """
+        self.backend.compact({
+            'epoch': self._epoch,
+            'counter': self._issued,
+            'records': [
+                [token, action, _dump_args(args), expires]
+                for token, (action, args, expires, _) in self._records.items()
+            ],
+        })
+        for token, (action, args, expires, _) in self._records.items():
+            self._records[token] = (action, args, expires, expires)
+        self.backend.compact_every = max(JOURNAL_COMPACT_EVERY, len(self._records))
+
+    def _save(self, entry):
+        """
+        Дописывает запись токена в журнал. Вызывается под блокировкой.
+        Ошибка записи не мешает показать кнопку: токен останется в памяти.
+        """
+        if self.backend is None:
+            return
+        try:
+            self.backend.write([entry])
+            if self.backend.needs_compaction():
+                self._compact()
+        except OSError as e:
+            print(f"Не удалось сохранить токен кнопки: {e}")
+
+    def encode(self, action, *args):
+        """
+        Возвращает callback_data "<действие>:<токен>" для действия с аргументами.
+        """
+        key = (action, args)
+        now = time.time()
+        with self._lock:
+            token = self._tokens.get(key)
+            if token is None:
+                token = self._tokens[key] = self._epoch + to_base62(self._issued)
+                self._issued += 1
+                expires = now + self.ttl
+                self._records[token] = (action, args, expires, expires)
+                self._evict_overflow()
+                self._save({
+                    'op': 'add', 'counter': self._issued, 'token': token,
+                    'action': action, 'args': _dump_args(args), 'expires': expires,
+                })
+            else:
+                self._touch(token, now)
+        return f"{action}:{token}"
+
+    def decode(self, data):
+        """
+        Возвращает аргументы действия из callback_data
+        или None, если токен неизвестен или устарел.
+        Нажатие продлевает срок действия токена.
+        """
+        action, _, token = data.partition(':')
+        now = time.time()
+        with self._lock:
+            record = self._records.get(token)
+            if record is None or record[0] != action or record[2] < now:
+                return None
+            self._touch(token, now)
+        return record[1]
+
+    def _touch(self, token, now):
+        """
+        Продлевает срок токена. В журнал продление пишется, только если
+        записанный срок истекает раньше, чем через половину TTL.
+        Вызывается под блокировкой.
+        """
+        action, args, _, saved = self._records[token]
+        expires = now + self.ttl
+        write = saved - now < self.ttl / 2
+        self._records[token] = (action, args, expires, expires if write else saved)
+        self._records.move_to_end(token)
+        if write:
+            self._save({
+                'op': 'touch', 'token': token,
+                'action': action, 'args': _dump_args(args), 'expires': expires,
+            })
+
+    def _evict_overflow(self):
+        """
+        Вытесняет давно не использованные записи сверх max_size.
+        """
+        while len(self._records) > self.max_size:
+            _, (old_action, old_args, _, _) = self._records.popitem(last=False)
+            del self._tokens[(old_action, old_args)]
+
+    def evict_expired(self):
+        """
+        Удаляет устаревшие записи. Возвращает их число.
+        Из файла они уходят при следующей компактизации.
+        """
+        now = time.time()
+        with self._lock:
+            expired = [token for token, record in self._records.items() if record[2] < now]
+            for token in expired:
+                action, args, _, _ = self._records.pop(token)
+                del self._tokens[(action, args)]
+        return len(expired)
+
+    def __len__(self):
+        return len(self._records)
+
+
+callbacks = CallbackTable(CALLBACKS_FILENAME)
+encode_callback = callbacks.encode
+decode_callback = callbacks.decode
+
+
+def answer_expired(bot, call):
+    """
+    Сообщает пользователю, что нажатая кнопка устарела.
+    """
+    bot.answer_callback_query(call.id, "Кнопка устарела, откройте список заново.")
@@ -0,0 +1,114 @@
+# callback_router.py
+"""
+Модуль для маршрутизации нажатий inline-кнопок.
+Вместо проверки лямбда-предикатов всех хендлеров по очереди нажатие
+разбирается одним обработчиком: сначала callback_data ищется в словаре
+точных действий, затем - самый длинный подходящий префикс в префиксном
+дереве. Стоимость не зависит от числа зарегистрированных хендлеров.
+
+    @router.on("approve_events")
+    @router.on_prefix("pending_page:")
+    def approve_events(call):
+        ...
+
+Префиксы параметрических действий регистрируются вместе с разделителем
+(например, "edit_event:"), поэтому не пересекаются с похожими точными
+действиями ("edit_events"). Пересечения, которые всё же возникли,
+печатаются при регистрации, то есть при запуске бота.
+"""
+
+
+class CallbackRouter:
+    """
+    Таблица хендлеров inline-кнопок: словарь точных действий
+    и префиксное дерево действий с параметрами.
+    """
+
+    def __init__(self):
+        self._exact = {}
+        # Узел дерева: символ -> дочерний узел, None -> (префикс, хендлер)
+        self._prefixes = {}
+        self.ambiguities = []
+
+    def on(self, *actions):
+        """
+        Регистрирует хендлер для callback_data, равной одному из actions.
+        """
+        def decorator(handler):
+            for action in actions:
+                if action in self._exact:
+                    raise ValueError(f"Действие {action} уже зарегистрировано")
+                self._exact[action] = handler
+                match = self._match_prefix(action)
+                if match is not None:
+                    self._report(f"действие «{action}» подходит и под префикс «{match[0]}»")
+            return handler
+        return decorator
+
+    def on_prefix(self, *prefixes):
+        """
+        Регистрирует хендлер для callback_data, начинающейся с одного из prefixes.
+        """
+        def decorator(handler):
+            for prefix in prefixes:
+                node = self._prefixes
+                for char in prefix:
+                    if None in node:
+                        self._report(f"префикс «{prefix}» продолжает префикс «{node[None][0]}»")
+                    node = node.setdefault(char, {})
+                if None in node:
+                    raise ValueError(f"Префикс {prefix} уже зарегистрирован")
+                if node:
+                    self._report(f"префикс «{prefix}» - начало более длинного префикса")
+                node[None] = (prefix, handler)
+                for action in self._exact:
+                    if action.startswith(prefix):
+                        self._report(f"действие «{action}» подходит и под префикс «{prefix}»")
+            return handler
+        return decorator
+
+    def _report(self, text):
+        self.ambiguities.append(text)
+        print(f"Неоднозначный маршрут кнопок: {text}")
+
+    def _match_prefix(self, data):
+        """
+        Ищет самый длинный зарегистрированный префикс callback_data.
+        Возвращает (префикс, хендлер) или None.
+        """
+        node = self._prefixes
+        match = node.get(None)
+        for char in data:
+            node = node.get(char)
+            if node is None:
+                break
+            match = node.get(None, match)
+        return match
+
+    def resolve(self, data):
+        """
+        Возвращает хендлер для callback_data или None.
+        """
+        handler = self._exact.get(data)
+        if handler is not None:
+            return handler
+        match = self._match_prefix(data)
+        return match[1] if match is not None else None
+
+
+router = CallbackRouter()
+
+
+def setup_callback_router(bot):
+    """
+    Регистрирует в боте единственный обработчик нажатий,
+    который передаёт их хендлерам router.
+    """
+    @bot.callback_query_handler(func=lambda call: True)
+    def handle_callback(call):
+        handler = router.resolve(call.data or '')
+        if handler is None:
+            # Кнопка без хендлера - просто убираем часики на кнопке
+            bot.answer_callback_query(call.id)
+            return
+        handler(call)
@@ -10,3 +10,41 @@ from dotenv import load_dotenv
 load_dotenv()  # Загружаем переменные из файла .env
 
 TOKEN = os.getenv("TOKEN")  # Токен бота
+# Обработка обновлений: число полос-потоков (обновления одного чата всегда
+# попадают в одну полосу) и максимальная длина очереди полосы
+BOT_NUM_THREADS = int(os.getenv("BOT_NUM_THREADS", "8"))
+DISPATCHER_LANE_DEPTH = int(os.getenv("DISPATCHER_LANE_DEPTH", "100"))
+# Генерация PDF-отчётов: число процессов и максимум отчётов в очереди
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", "2"))
+PDF_QUEUE_SIZE = int(os.getenv("PDF_QUEUE_SIZE", "20"))
+# Выгрузки администратора: размер файла, до которого он держится в памяти
+EXPORT_SPOOL_SIZE = int(os.getenv("EXPORT_SPOOL_SIZE", str(1024 * 1024)))
+
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "json")  # Хранилище данных: json или sqlite
+SQLITE_FILENAME = os.getenv("SQLITE_FILENAME", "basa.sqlite3")  # Файл базы для бэкенда sqlite
+# Отложенная запись: окно накопления изменений в секундах (0 - писать сразу)
+# и максимальное число накопленных операций до принудительного сброса
+WRITE_BEHIND_WINDOW = float(os.getenv("WRITE_BEHIND_WINDOW", "0"))
+WRITE_BEHIND_MAX_PENDING = int(os.getenv("WRITE_BEHIND_MAX_PENDING", "100"))
+
+# Рассылка: число потоков отправки и лимиты Telegram (сообщений в секунду)
+BROADCAST_WORKERS = int(os.getenv("BROADCAST_WORKERS", "8"))
+BROADCAST_RATE = float(os.getenv("BROADCAST_RATE", "30"))
+BROADCAST_PER_CHAT_RATE = float(os.getenv("BROADCAST_PER_CHAT_RATE", "1"))
+
+# Режим получения обновлений: polling (для разработки) или webhook
+BOT_MODE = os.getenv("BOT_MODE", "polling")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL")  # Публичный адрес бота; без него вебхук в Telegram не регистрируется
+WEBHOOK_HOST = os.getenv("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET")  # Секретный токен запросов от Telegram, обязателен для webhook
+
+# Состояние пошаговых диалогов: файл хранения и время жизни брошенного диалога в секундах
+CONVERSATIONS_FILENAME = os.getenv("CONVERSATIONS_FILENAME", "conversations.json")
+CONVERSATION_TTL = int(os.getenv("CONVERSATION_TTL", "86400"))
+
+# Короткие токены callback_data: файл хранения, время жизни токена в секундах и размер таблицы токенов
+CALLBACKS_FILENAME = os.getenv("CALLBACKS_FILENAME", "callbacks.json")
+CALLBACK_TTL = int(os.getenv("CALLBACK_TTL", "172800"))
+CALLBACK_TABLE_SIZE = int(os.getenv("CALLBACK_TABLE_SIZE", "100000"))
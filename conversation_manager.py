@@ -0,0 +1,174 @@
+# conversation_manager.py
+"""
+Модуль для хранения состояния пошаговых диалогов (регистрация,
+подача мероприятия, редактирование данных).
+Вместо замыканий register_next_step_handler, которые живут только в памяти
+TeleBot, для каждого чата хранится компактная запись: имя следующего шага,
+уже введённые ответы и срок действия. Изменения записей дописываются
+в журнал рядом с файлом, поэтому переживают перезапуск бота, а брошенные
+диалоги удаляются по истечении TTL.
+
+Шаг диалога - функция step(message, **ответы), помеченная декоратором
+conversation_step. Следующий шаг назначается вызовом
+next_step(chat_id, step, **ответы).
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from config import CONVERSATIONS_FILENAME, CONVERSATION_TTL
+from data_manager import JsonStateBackend
+
+# Зарегистрированные шаги диалогов по имени функции
+STEPS = {}
+
+
+def conversation_step(func):
+    """
+    Регистрирует функцию как шаг диалога.
+    Шаги ищутся по имени, поэтому имена должны быть уникальны.
+    """
+    if STEPS.get(func.__name__, func) is not func:
+        raise ValueError(f"Шаг диалога {func.__name__} уже зарегистрирован")
+    STEPS[func.__name__] = func
+    return func
+
+
+class ConversationStore:
+    """
+    Потокобезопасное хранилище состояний диалогов с TTL.
+    Запись чата: [имя шага, ответы, время истечения].
+    Файл filename - снимок всех записей, рядом журнал: каждое изменение
+    дописывает в него одну строку {"op": "set"|"pop", "chat_id", "session"}.
+    Журнал сворачивается в снимок при запуске и по мере роста.
+    """
+
+    def __init__(self, filename=None, ttl=CONVERSATION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._sessions = {}
+        self._consumed = set()  # чаты, чья запись забрана, но удаление ещё не записано
+        self.backend = JsonStateBackend(filename) if filename else None
+        if self.backend is not None:
+            self._sessions, entries = self.backend.load()
+            for entry in entries:
+                if entry['op'] == 'set':
+                    self._sessions[entry['chat_id']] = entry['session']
+                else:
+                    self._sessions.pop(entry['chat_id'], None)
+            now = time.time()
+            self._sessions = {
+                chat_id: session for chat_id, session in self._sessions.items() if session[2] >= now
+            }
+            self.backend.compact(self._sessions)
+
+    def _write(self, entries):
+        """
+        Дописывает изменения в журнал, при необходимости сворачивает его.
+        Вызывается под блокировкой.
+        """
+        if self.backend is None or not entries:
+            return
+        self.backend.write(entries)
+        if self.backend.needs_compaction():
+            self.backend.compact(self._sessions)
+
+    def set(self, chat_id, step, data):
+        """
+        Назначает чату следующий шаг диалога и продлевает срок действия.
+        """
+        chat_id = str(chat_id)
+        session = [step, data, time.time() + self.ttl]
+        with self._lock:
+            self._sessions[chat_id] = session
+            self._consumed.discard(chat_id)
+            self._write([{'op': 'set', 'chat_id': chat_id, 'session': session}])
+
+    def get(self, chat_id):
+        """
+        Возвращает пару (шаг, ответы) или None, если диалога нет или он истёк.
+        """
+        session = self._sessions.get(str(chat_id))
+        if session is None or session[2] < time.time():
+            return None
+        return session[0], session[1]
+
+    def pop(self, chat_id):
+        """
+        Забирает состояние диалога чата (как get) и удаляет его.
+        """
+        with self.consume(chat_id) as session:
+            return session
+
+    @contextmanager
+    def consume(self, chat_id):
+        """
+        Забирает состояние диалога чата (как get) на время обработки шага.
+        Запись удаляется из памяти сразу, а в журнал удаление попадает
+        при выходе из блока - и только если шаг не назначил чату новый
+        (set внутри блока сам перезаписывает запись).
+        """
+        chat_id = str(chat_id)
+        with self._lock:
+            session = self._sessions.pop(chat_id, None)
+            if session is not None:
+                self._consumed.add(chat_id)
+        try:
+            if session is None or session[2] < time.time():
+                yield None
+            else:
+                yield session[0], session[1]
+        finally:
+            with self._lock:
+                if chat_id in self._consumed:
+                    self._consumed.discard(chat_id)
+                    self._write([{'op': 'pop', 'chat_id': chat_id}])
+
+    def evict_expired(self):
+        """
+        Удаляет брошенные диалоги с истёкшим сроком.
+        Возвращает число удалённых записей.
+        """
+        now = time.time()
+        with self._lock:
+            expired = [chat_id for chat_id, session in self._sessions.items() if session[2] < now]
+            for chat_id in expired:
+                del self._sessions[chat_id]
+            self._write([{'op': 'pop', 'chat_id': chat_id} for chat_id in expired])
+        return len(expired)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+conversations = ConversationStore(CONVERSATIONS_FILENAME)
+
+
+def next_step(chat_id, step, **data):
+    """
+    Ожидает следующее сообщение чата и передаёт его в шаг step
+    вместе с уже собранными ответами data.
+    """
+    conversations.set(chat_id, step.__name__, data)
+
+
+def setup_conversation_router(bot):
+    """
+    Регистрирует обработчик, передающий сообщения в текущий шаг диалога.
+    Вызывается до регистрации остальных обработчиков сообщений, чтобы,
+    как и с register_next_step_handler, ответ в диалоге не попадал
+    в команды и другие хендлеры.
+    """
+    @bot.message_handler(func=lambda message: conversations.get(message.chat.id) is not None)
+    def handle_conversation_step(message):
+        # Шаг, назначивший следующий, записывает состояние чата один раз
+        with conversations.consume(message.chat.id) as session:
+            if session is None:
+                return
+            step, data = session
+            handler = STEPS.get(step)
+            if handler is None:
+                print(f"Неизвестный шаг диалога {step} в чате {message.chat.id}")
+                return
+            handler(message, **data)
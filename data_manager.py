@@ -1,51 +1,1093 @@
 # data_manager.py
 """
 Модуль для работы с данными.
-Содержит функции загрузки и сохранения данных, а также вспомогательные функции для работы с JSON.
+Содержит функции загрузки и сохранения данных, а также хранилище DataStore,
+которое держит базу в памяти и передаёт каждое изменение бэкенду хранения.
+
+Бэкенд выбирается настройкой STORAGE_BACKEND:
+- json (JsonBackend): basa.json - снимок базы, всегда перезаписывается
+  атомарно (временный файл + os.replace), поэтому не может оказаться
+  обрезанным; basa.json.journal - журнал изменений, по одной JSON-строке
+  на операцию. Запись в журнал - это дозапись одной строки с fsync.
+  При запуске снимок загружается, журнал проигрывается поверх него,
+  после чего снимок пересохраняется, а журнал очищается (компактизация).
+  Компактизация также выполняется каждые JOURNAL_COMPACT_EVERY операций.
+- sqlite (SqliteBackend из sqlite_backend.py): таблицы SQLite в режиме WAL,
+  каждая операция меняет только затронутые строки.
+
+Если задан WRITE_BEHIND_WINDOW, хранилище работает в режиме отложенной
+записи: изменения сразу видны в памяти, а на диск уходят одной пачкой
+раз в WRITE_BEHIND_WINDOW секунд или по накоплении WRITE_BEHIND_MAX_PENDING
+операций. Транзакции с durable=True и DataStore.close() сбрасывают
+накопленное немедленно.
 """
 
+import heapq
 import json
+import os
+import re
+import threading
+import uuid
+from bisect import bisect_left, bisect_right, insort
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from config import STORAGE_BACKEND, SQLITE_FILENAME, WRITE_BEHIND_WINDOW, WRITE_BEHIND_MAX_PENDING
 
 DATA_FILENAME = 'basa.json'
+JOURNAL_SUFFIX = '.journal'
+JOURNAL_COMPACT_EVERY = 500
+COLLECTIONS = ('students', 'activities', 'achievements', 'admins')
+
+# Формат даты мероприятия (поле date)
+EVENT_DATE_FORMAT = '%Y-%m-%d'
+
+# Состояние доставки сообщений студенту (поле delivery_status).
+# Отсутствие поля означает, что студент доступен.
+DELIVERY_ACTIVE = 'active'
+
+# Результат отправки достижения (DataStore.add_achievement)
+ACHIEVEMENT_ADDED = 'added'
+ACHIEVEMENT_UPDATED = 'updated'  # изменено ещё не подтверждённое достижение
+ACHIEVEMENT_RESUBMITTED = 'resubmitted'  # подтверждённое снова ушло на проверку
+ACHIEVEMENT_UNCHANGED = 'unchanged'  # место то же, менять нечего
 
 def load_data(filename=DATA_FILENAME):
     """
     Загружает данные из JSON-файла.
-    Если файл не найден или повреждён, возвращает пустую структуру данных.
+    Если файла нет, возвращает пустую структуру данных.
+    Повреждённый файл не подменяется пустой базой: json.JSONDecodeError
+    пробрасывается дальше, чтобы не потерять данные молча.
     """
     try:
         with open(filename, 'r', encoding='utf-8') as file:
             data = json.load(file)
-            # Проверяем наличие необходимых ключей
-            for key in ['students', 'activities', 'achievements', 'admins']:
-                if key not in data:
-                    data[key] = []
-            return data
-    except (FileNotFoundError, json.JSONDecodeError):
-        return {'students': [], 'activities': [], 'achievements': [], 'admins': []}
+    except FileNotFoundError:
+        return {key: [] for key in COLLECTIONS}
+    # Проверяем наличие необходимых ключей
+    for key in COLLECTIONS:
+        if key not in data:
+            data[key] = []
+    return data
+
+def save_data(data, filename=DATA_FILENAME, indent=4):
+    """
+    Атомарно сохраняет данные в JSON-файл.
+    Данные пишутся во временный файл рядом с основным и подменяют его
+    через os.replace, так что при сбое на диске остаётся либо старая,
+    либо новая версия целиком.
+    """
+    tmp_filename = f"{filename}.tmp"
+    with open(tmp_filename, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False, indent=indent)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(tmp_filename, filename)
+
+# Начала слов для мест, введённых прописью
+PLACE_WORDS = ('перв', 'втор', 'трет')
+
+# Страница мероприятий: items - мероприятия страницы, before/after - курсоры
+# (дата, id) для перехода на предыдущую/следующую страницу или None
+ActivityPage = namedtuple('ActivityPage', 'items before after')
+
+def parse_event_date(value):
+    """
+    Разбирает дату мероприятия в формате ГГГГ-ММ-ДД.
+    При неверном формате выбрасывает ValueError.
+    """
+    if not isinstance(value, str):
+        raise ValueError(f"Дата мероприятия должна быть строкой ГГГГ-ММ-ДД: {value!r}")
+    return datetime.strptime(value, EVENT_DATE_FORMAT).date()
+
+def parse_place(value):
+    """
+    Разбирает занятое место из свободного ввода студента
+    ("1", "1-е место", "второе"). Возвращает номер места или None.
+    """
+    text = str(value or '').strip().lower()
+    match = re.match(r'\d+', text)
+    if match:
+        return int(match.group())
+    for number, prefix in enumerate(PLACE_WORDS, start=1):
+        if text.startswith(prefix):
+            return number
+    return None
+
+def achievement_upsert_fields(existing, achievement):
+    """
+    Поля, которыми повторная отправка achievement обновляет уже
+    имеющееся достижение той же пары (студент, мероприятие).
+    Отправка с тем же местом ничего не меняет (None), другое место
+    снова уходит на проверку.
+    """
+    if existing.get('place') == achievement.get('place'):
+        return None
+    return {key: value for key, value in achievement.items() if key != 'id'}
+
+def read_journal(filename):
+    """
+    Читает записи журнала изменений.
+    Запись считается дописанной, только если за ней есть перевод строки.
+    Хвост после последнего перевода строки - след падения процесса во
+    время записи - отбрасывается. Повреждение в середине журнала
+    считается ошибкой.
+    Возвращает (записи, длина целой части файла в байтах).
+    """
+    try:
+        with open(filename, 'rb') as file:
+            content = file.read()
+    except FileNotFoundError:
+        return [], 0
+
+    complete = content.rfind(b'\n') + 1
+    if content[complete:].strip():
+        print(f"Журнал {filename}: отброшена недописанная запись")
+    entries = [
+        json.loads(line)
+        for line in content[:complete].decode('utf-8').split('\n')
+        if line.strip()
+    ]
+    return entries, complete
+
+
+class JsonBackend:
+    """
+    Хранение базы в JSON-снимке с журналом изменений.
+    """
+
+    # Отступ в снимке; None - компактная запись в одну строку
+    indent = 4
+    # Число операций журнала, после которого нужна компактизация
+    compact_every = JOURNAL_COMPACT_EVERY
+    # fsync после каждой записи в журнал
+    sync = True
+
+    def __init__(self, filename=DATA_FILENAME):
+        self.filename = filename
+        self.journal_filename = filename + JOURNAL_SUFFIX
+        self._journal = None
+        self._journal_size = 0
+
+    def load(self):
+        """
+        Возвращает снимок базы и список операций журнала,
+        которые нужно проиграть поверх него.
+        """
+        self.close()
+        entries, complete = read_journal(self.journal_filename)
+        self._truncate_journal(complete)
+        return self._load_snapshot(), entries
+
+    def _load_snapshot(self):
+        return load_data(self.filename)
+
+    def _truncate_journal(self, size):
+        """
+        Обрезает журнал до size байт, убирая недописанный хвост,
+        чтобы следующая запись не приклеилась к его обрывку.
+        """
+        try:
+            if os.path.getsize(self.journal_filename) <= size:
+                return
+        except FileNotFoundError:
+            return
+        with open(self.journal_filename, 'r+b') as file:
+            file.truncate(size)
+            file.flush()
+            os.fsync(file.fileno())
 
-def save_data(data, filename=DATA_FILENAME):
+    def write(self, entries):
+        """
+        Дописывает операции в журнал одной записью (с fsync, если sync).
+        Если запись не удалась, журнал обрезается до прежней длины,
+        чтобы в нём не остался обрывок.
+        """
+        if self._journal is None:
+            self._journal = open(self.journal_filename, 'ab')
+        data = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries).encode('utf-8')
+        start = self._journal.tell()
+        try:
+            self._journal.write(data)
+            self._journal.flush()
+            if self.sync:
+                os.fsync(self._journal.fileno())
+        except BaseException:
+            try:
+                self.close()
+            except OSError:
+                pass
+            self._truncate_journal(start)
+            raise
+        self._journal_size += len(entries)
+
+    def needs_compaction(self):
+        return self._journal_size >= self.compact_every
+
+    def compact(self, data):
+        """
+        Сохраняет снимок базы и очищает журнал.
+        """
+        save_data(data, self.filename, self.indent)
+        self.close()
+        self._journal = open(self.journal_filename, 'wb')
+        self._journal_size = 0
+
+    def close(self):
+        """
+        Закрывает файл журнала.
+        """
+        journal, self._journal = self._journal, None
+        if journal is not None:
+            journal.close()
+
+class ReadOnlyJsonBackend(JsonBackend):
+    """
+    JSON-база только для чтения (источник миграции): снимок и журнал
+    читаются, но не меняются - недописанный хвост журнала не обрезается,
+    компактизация ничего не сохраняет.
     """
-    Сохраняет данные в JSON-файл.
+
+    def load(self):
+        entries, _ = read_journal(self.journal_filename)
+        return self._load_snapshot(), entries
+
+    def write(self, entries):
+        raise RuntimeError(f"База {self.filename} открыта только для чтения")
+
+    def compact(self, data):
+        pass
+
+class JsonStateBackend(JsonBackend):
     """
-    with open(filename, 'w', encoding='utf-8') as file:
-        json.dump(data, file, ensure_ascii=False, indent=4)
+    Снимок с журналом для служебного состояния бота (диалоги, кнопки):
+    снимок - произвольный словарь, без отступов, пустой при отсутствии файла.
+    Формат операций журнала определяет владелец состояния.
+    """
+
+    indent = None
+
+    def _load_snapshot(self):
+        try:
+            with open(self.filename, 'r', encoding='utf-8') as file:
+                return json.load(file)
+        except FileNotFoundError:
+            return {}
+
+def create_backend():
+    """
+    Создаёт бэкенд хранения согласно настройке STORAGE_BACKEND.
+    """
+    if STORAGE_BACKEND == 'sqlite':
+        from sqlite_backend import SqliteBackend
+        return SqliteBackend(SQLITE_FILENAME, migrate_from=DATA_FILENAME)
+    if STORAGE_BACKEND != 'json':
+        raise ValueError(f"Неизвестный бэкенд хранения: {STORAGE_BACKEND}")
+    return JsonBackend(DATA_FILENAME)
+
+
+class DataStore:
+    """
+    Хранилище данных бота.
+    Загружает базу один раз при создании и отдаёт её из памяти.
+    Каждое изменение описывается операцией, которая сначала сохраняется
+    бэкендом, а затем применяется к данным в памяти. Все операции
+    идемпотентны (записи адресуются по ключу), поэтому повторное
+    проигрывание журнала поверх уже сохранённого снимка безопасно.
+    Поиск по ключам идёт через хеш-индексы, которые обновляются
+    вместе с данными.
+    При write_behind > 0 операции не пишутся сразу, а копятся и
+    сбрасываются в бэкенд пачкой (см. flush).
+    """
+
+    def __init__(self, backend, write_behind=0, max_pending=WRITE_BEHIND_MAX_PENDING):
+        self.backend = backend
+        self.write_behind = write_behind
+        self.max_pending = max_pending
+        self._write_lock = threading.RLock()
+        self._local = threading.local()
+        self._pending = []
+        self._flush_timer = None
+        # Номер версии мероприятий: растёт при каждом их изменении,
+        # по нему кэши отображения понимают, что данные устарели
+        self.activities_version = 0
+        self._listeners = []
+        self.reload()
+
+    def reload(self):
+        """
+        Загружает базу из бэкенда, проигрывает недописанные в снимок
+        операции и выполняет компактизацию.
+        """
+        with self._write_lock:
+            self.data, entries = self.backend.load()
+            self._build_indexes()
+            self.activities_version += 1
+            if self._undated_activities:
+                print(f"Мероприятия с неверной датой: {', '.join(self._undated_activities)}")
+            # Журнал проигрывается до слияния дублей: его операции
+            # могут адресовать по id дубль, который слияние уберёт
+            for entry in entries:
+                self._apply(entry)
+            backfilled = self._backfill_achievement_ids()
+            merged = self._merge_duplicate_achievements()
+            if merged:
+                self._build_indexes()
+            self._build_pending_queues()
+            if entries or backfilled or merged:
+                self.compact()
+            for listener in self._listeners:
+                listener.rebuild(self)
+
+    def add_listener(self, listener):
+        """
+        Подписывает listener на изменения данных.
+        listener.rebuild(store) вызывается сразу и после каждой загрузки
+        базы, listener.changed(kind, key, record) - после каждого изменения
+        записи: kind - 'student', 'activity' или 'achievement', key - её
+        ключ, record - запись после изменения или None, если она удалена.
+        Оба метода вызываются под блокировкой записи.
+        """
+        with self._write_lock:
+            self._listeners.append(listener)
+            listener.rebuild(self)
+
+    def _notify(self, kind, key, record):
+        for listener in self._listeners:
+            listener.changed(kind, key, record)
+
+    def compact(self):
+        """
+        Сохраняет полный снимок базы в бэкенде.
+        Снимок включает и накопленные операции, поэтому очередь
+        отложенной записи очищается.
+        """
+        with self._write_lock:
+            self._pending = []
+            self.backend.compact(self.data)
+
+    def flush(self):
+        """
+        Сбрасывает в бэкенд операции, накопленные в режиме отложенной записи.
+        """
+        with self._write_lock:
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+            if not self._pending:
+                return
+            self.backend.write(self._pending)
+            self._pending = []
+            if self.backend.needs_compaction():
+                self.compact()
+
+    def _flush_in_background(self):
+        try:
+            self.flush()
+        except Exception as e:
+            # Операции остаются в очереди и уйдут со следующей попыткой
+            print(f"Не удалось сохранить изменения: {e}")
+            with self._write_lock:
+                self._schedule_flush()
+
+    def _schedule_flush(self):
+        if self._flush_timer is None:
+            self._flush_timer = threading.Timer(self.write_behind, self._flush_in_background)
+            self._flush_timer.daemon = True
+            self._flush_timer.start()
+
+    def close(self):
+        """
+        Сбрасывает накопленные изменения и закрывает бэкенд хранения.
+        Вызывается при остановке бота.
+        """
+        with self._write_lock:
+            self.flush()
+            self.backend.close()
+
+    def _merge_duplicate_achievements(self):
+        """
+        Оставляет по одному достижению на пару (студент, мероприятие):
+        в старых базах повторная отправка создавала дубли. Из дублей
+        остаётся подтверждённое (его уже проверил администратор),
+        а из неподтверждённых - присланное последним.
+        Возвращает число удалённых дублей; после удаления снимок
+        пересохраняется, так что слияние выполняется один раз.
+        """
+        keepers = {}
+        for achievement in self.achievements:
+            pair = (str(achievement['student_id']), str(achievement['event_id']))
+            kept = keepers.get(pair)
+            if kept is None or achievement.get('confirmed', False) or not kept.get('confirmed', False):
+                keepers[pair] = achievement
+        if len(keepers) == len(self.achievements):
+            return 0
+        merged = len(self.achievements) - len(keepers)
+        kept_ids = {id(achievement) for achievement in keepers.values()}
+        self.data['achievements'] = [a for a in self.achievements if id(a) in kept_ids]
+        print(f"Объединены дубли достижений: {merged}")
+        return merged
+
+    def _backfill_achievement_ids(self):
+        """
+        Выдаёт id достижениям из старых баз, где его не было.
+        Без id достижение нельзя однозначно адресовать в журнале.
+        """
+        backfilled = False
+        for achievement in self.achievements:
+            if 'id' not in achievement:
+                achievement['id'] = str(uuid.uuid4())
+                self._achievements_by_id[achievement['id']] = achievement
+                backfilled = True
+        return backfilled
+
+    @property
+    def students(self):
+        return self.data['students']
+
+    @property
+    def activities(self):
+        return self.data['activities']
+
+    @property
+    def achievements(self):
+        return self.data['achievements']
+
+    @property
+    def admins(self):
+        return self.data['admins']
+
+    # --- Индексы ---
+    # Ключи приводятся к строкам: telegram_id хранится числом,
+    # а из callback_data приходит строкой.
+
+    def _build_indexes(self):
+        """
+        Строит все индексы по текущим данным.
+        """
+        self._students_by_id = {str(s['telegram_id']): s for s in self.students}
+        self._reachable_students = {}
+        for student in self.students:
+            self._index_delivery(student)
+        self._activities_by_id = {e['id']: e for e in self.activities if 'id' in e}
+        self._activities_by_date = {True: [], False: []}
+        self._activity_positions = {}
+        self._undated_activities = {}
+        for activity in self._activities_by_id.values():
+            self._index_activity(activity)
+        self._admin_ids = {str(admin['telegram_id']) for admin in self.admins}
+        self._achievements_by_id = {}
+        self._achievements_by_student = {}
+        self._achievements_by_event = {}
+        self._achievements_by_pair = {}
+        for achievement in self.achievements:
+            self._index_achievement(achievement)
+        self._pending_activities = {}
+        self._pending_achievements = {}
+
+    def _build_pending_queues(self):
+        """
+        Строит очереди подтверждения: неподтверждённые записи по id
+        в порядке поступления (порядок вставки словаря). Строится после
+        выдачи id старым достижениям, поэтому в очередь попадают все.
+        """
+        self._pending_activities = {}
+        self._pending_achievements = {}
+        for activity in self._activities_by_id.values():
+            self._track_pending(self._pending_activities, activity)
+        for achievement in self.achievements:
+            self._track_pending(self._pending_achievements, achievement)
+
+    @staticmethod
+    def _track_pending(queue, record):
+        """
+        Ставит запись в конец очереди подтверждения или убирает из неё.
+        Запись, уже стоящая в очереди, своего места не теряет.
+        """
+        if record.get('confirmed', False):
+            queue.pop(record['id'], None)
+        elif record['id'] not in queue:
+            queue[record['id']] = record
+
+    def _index_delivery(self, student):
+        key = str(student['telegram_id'])
+        if student.get('delivery_status', DELIVERY_ACTIVE) == DELIVERY_ACTIVE:
+            self._reachable_students[key] = student
+        else:
+            self._reachable_students.pop(key, None)
+
+    def _index_activity(self, activity):
+        """
+        Добавляет мероприятие в индекс, упорядоченный по дате.
+        Подтверждённые и неподтверждённые мероприятия лежат в отдельных
+        списках пар (дата, id). Мероприятия с неверной датой (из старых баз)
+        в индекс не попадают и запоминаются в _undated_activities.
+        """
+        try:
+            event_date = parse_event_date(activity.get('date'))
+        except ValueError:
+            self._undated_activities[activity['id']] = activity
+            return
+        confirmed = bool(activity.get('confirmed', False))
+        position = (event_date, activity['id'])
+        insort(self._activities_by_date[confirmed], position)
+        self._activity_positions[activity['id']] = (confirmed, position)
+
+    def _unindex_activity(self, activity):
+        self._undated_activities.pop(activity['id'], None)
+        located = self._activity_positions.pop(activity['id'], None)
+        if located is not None:
+            confirmed, position = located
+            bucket = self._activities_by_date[confirmed]
+            del bucket[bisect_left(bucket, position)]
+
+    def _index_achievement(self, achievement):
+        student_id, event_id = str(achievement['student_id']), str(achievement['event_id'])
+        if 'id' in achievement:
+            self._achievements_by_id[achievement['id']] = achievement
+        self._achievements_by_student.setdefault(student_id, []).append(achievement)
+        self._achievements_by_event.setdefault(event_id, []).append(achievement)
+        # Уникальный индекс: на пару (студент, мероприятие) одно достижение
+        self._achievements_by_pair[(student_id, event_id)] = achievement
+
+    def _unindex_achievement(self, achievement):
+        student_id, event_id = str(achievement['student_id']), str(achievement['event_id'])
+        self._achievements_by_id.pop(achievement.get('id'), None)
+        if self._achievements_by_pair.get((student_id, event_id)) is achievement:
+            del self._achievements_by_pair[(student_id, event_id)]
+        for index, key in ((self._achievements_by_student, student_id),
+                           (self._achievements_by_event, event_id)):
+            bucket = index.get(key, [])
+            bucket[:] = [ach for ach in bucket if ach is not achievement]
+            if not bucket:
+                index.pop(key, None)
+
+    # --- Чтение ---
+
+    def get_student(self, telegram_id):
+        """
+        Возвращает студента по telegram_id или None.
+        """
+        return self._students_by_id.get(str(telegram_id))
+
+    def get_activity(self, event_id):
+        """
+        Возвращает мероприятие по id или None.
+        """
+        return self._activities_by_id.get(event_id)
+
+    def get_achievement(self, student_id, event_id):
+        """
+        Возвращает достижение студента на мероприятии или None.
+        """
+        return self._achievements_by_pair.get((str(student_id), str(event_id)))
+
+    def achievements_for_student(self, student_id):
+        """
+        Возвращает список достижений студента.
+        """
+        return list(self._achievements_by_student.get(str(student_id), []))
+
+    def student_events(self, student_id):
+        """
+        Возвращает мероприятия, на которых у студента есть достижения.
+        """
+        events = []
+        for achievement in self._achievements_by_student.get(str(student_id), []):
+            event = self._activities_by_id.get(achievement['event_id'])
+            if event:
+                events.append(event)
+        return events
+
+    def achievements_for_event(self, event_id):
+        """
+        Возвращает список достижений на мероприятии.
+        """
+        return list(self._achievements_by_event.get(str(event_id), []))
+
+    def activities_between(self, start=None, end=None, confirmed=True):
+        """
+        Возвращает мероприятия с датой от start до end включительно
+        (None - без ограничения) в порядке дат.
+        confirmed=False - только ожидающие подтверждения,
+        confirmed=None - все мероприятия.
+        """
+        if confirmed is None:
+            positions = heapq.merge(*(
+                self._date_slice(bucket, start, end) for bucket in self._activities_by_date.values()
+            ))
+        else:
+            positions = self._date_slice(self._activities_by_date[bool(confirmed)], start, end)
+        activities = (self._activities_by_id.get(event_id) for _, event_id in positions)
+        return [activity for activity in activities if activity is not None]
+
+    @staticmethod
+    def _date_slice(bucket, start, end):
+        low = 0 if start is None else bisect_left(bucket, (start,))
+        high = len(bucket) if end is None else bisect_left(bucket, (end + timedelta(days=1),))
+        return bucket[low:high]
+
+    def activities_page(self, cursor=None, backward=False, limit=5, start=None, confirmed=True):
+        """
+        Возвращает страницу мероприятий в порядке дат (ActivityPage).
+        cursor - позиция (дата, id) с соседней страницы: страница строится
+        после неё, а при backward=True - перед ней. Без курсора возвращается
+        первая страница. start - самая ранняя дата.
+        Стоимость - бинарный поиск и срез длиной limit, независимо от того,
+        сколько мероприятий в базе.
+        """
+        if confirmed is None:
+            buckets = self._activities_by_date.values()
+        else:
+            buckets = [self._activities_by_date[bool(confirmed)]]
+        windows = []
+        for bucket in buckets:
+            low = 0 if start is None else bisect_left(bucket, (start,))
+            if backward:
+                high = bisect_left(bucket, cursor) if cursor is not None else len(bucket)
+                windows.append(bucket[max(low, high - limit - 1):high])
+            else:
+                if cursor is not None:
+                    low = max(low, bisect_right(bucket, cursor))
+                windows.append(bucket[low:low + limit + 1])
+        positions = list(heapq.merge(*windows))
+        if backward:
+            more = len(positions) > limit
+            positions = positions[-limit:]
+            has_before, has_after = more, cursor is not None
+        else:
+            more = len(positions) > limit
+            positions = positions[:limit]
+            has_before, has_after = cursor is not None, more
+        activities = (self._activities_by_id.get(event_id) for _, event_id in positions)
+        items = [activity for activity in activities if activity is not None]
+        return ActivityPage(
+            items,
+            positions[0] if positions and has_before else None,
+            positions[-1] if positions and has_after else None,
+        )
+
+    def upcoming_activities(self, confirmed=True):
+        """
+        Возвращает мероприятия начиная с сегодняшнего дня.
+        """
+        return self.activities_between(date.today(), None, confirmed)
+
+    def past_activities(self, confirmed=True):
+        """
+        Возвращает прошедшие мероприятия (до вчерашнего дня включительно).
+        """
+        return self.activities_between(None, date.today() - timedelta(days=1), confirmed)
+
+    def activities_this_week(self, confirmed=True):
+        """
+        Возвращает мероприятия текущей недели (с понедельника по воскресенье).
+        """
+        monday = date.today() - timedelta(days=date.today().weekday())
+        return self.activities_between(monday, monday + timedelta(days=6), confirmed)
+
+    def pending_activities(self, offset=0, limit=None):
+        """
+        Возвращает неподтверждённые мероприятия в порядке поступления.
+        """
+        return self._pending_slice(self._pending_activities, offset, limit)
+
+    def pending_achievements(self, offset=0, limit=None):
+        """
+        Возвращает неподтверждённые достижения в порядке поступления.
+        """
+        return self._pending_slice(self._pending_achievements, offset, limit)
+
+    def pending_count(self):
+        """
+        Возвращает длины очередей подтверждения: (мероприятия, достижения).
+        """
+        return len(self._pending_activities), len(self._pending_achievements)
+
+    @staticmethod
+    def _pending_slice(queue, offset, limit):
+        # list() по словарю выполняется целиком под GIL, поэтому
+        # читателю не мешает одновременная запись
+        records = list(queue.values())
+        return records[offset:] if limit is None else records[offset:offset + limit]
+
+    def get_achievement_by_id(self, achievement_id):
+        """
+        Возвращает достижение по id или None.
+        """
+        return self._achievements_by_id.get(achievement_id)
+
+    def undated_activities(self):
+        """
+        Возвращает мероприятия с неверной датой, которые не попадают
+        ни в один запрос по датам.
+        """
+        return list(self._undated_activities.values())
+
+    def reachable_students(self):
+        """
+        Возвращает студентов, которым можно доставить сообщение
+        (не заблокировавших бота и с существующим чатом).
+        """
+        return list(self._reachable_students.values())
+
+    def is_admin(self, telegram_id):
+        """
+        Проверяет, является ли пользователь администратором.
+        """
+        return str(telegram_id) in self._admin_ids
+
+    # --- Транзакции и журнал операций ---
+
+    @contextmanager
+    def transaction(self, durable=False):
+        """
+        Открывает транзакцию записи:
+
+            with store.transaction() as tx:
+                if not store.is_admin(telegram_id):
+                    tx.add_admin(admin)
+
+        Писатели сериализуются блокировкой хранилища, которая держится
+        только на время блока; читатели блокировку не берут и продолжают
+        работать с данными в памяти. Операции транзакции копятся и при
+        выходе из блока одной записью попадают в журнал, после чего
+        применяются к данным. При исключении внутри блока ничего не
+        записывается. Вложенная транзакция в том же потоке присоединяется
+        к внешней.
+        durable=True отключает отложенную запись для этой транзакции:
+        к выходу из блока её операции (и всё накопленное ранее) уже на диске.
+        """
+        current = getattr(self._local, 'transaction', None)
+        if current is not None:
+            current.durable = current.durable or durable
+            yield current
+            return
+        with self._write_lock:
+            tx = Transaction(self, durable)
+            self._local.transaction = tx
+            try:
+                yield tx
+            finally:
+                self._local.transaction = None
+            self._commit(tx.entries, tx.durable)
+
+    def _commit(self, entries, durable):
+        """
+        Сохраняет операции в бэкенде и применяет их к данным в памяти.
+        В режиме отложенной записи операции применяются сразу,
+        а в бэкенд попадают при ближайшем сбросе.
+        Вызывается под блокировкой записи.
+        """
+        if not entries:
+            return
+        if self.write_behind and not durable:
+            for entry in entries:
+                self._apply(entry)
+            self._pending.extend(entries)
+            if len(self._pending) >= self.max_pending:
+                self.flush()
+            else:
+                self._schedule_flush()
+            return
+        self.backend.write(self._pending + entries)
+        self._pending = []
+        for entry in entries:
+            self._apply(entry)
+        if self.backend.needs_compaction():
+            self.compact()
+
+    def _apply(self, entry):
+        """
+        Применяет одну операцию журнала к данным и индексам.
+        """
+        op = entry['op']
+        if op == 'add_student':
+            record = entry['record']
+            existing = self.get_student(record['telegram_id'])
+            if existing is not None:
+                existing.update(record)
+                self._index_delivery(existing)
+            else:
+                record = dict(record)
+                self.students.append(record)
+                self._students_by_id[str(record['telegram_id'])] = record
+                self._index_delivery(record)
+            self._notify('student', str(record['telegram_id']), self.get_student(record['telegram_id']))
+        elif op == 'update_student':
+            student = self.get_student(entry['telegram_id'])
+            if student is not None:
+                student.update(entry['fields'])
+                self._index_delivery(student)
+                self._notify('student', str(entry['telegram_id']), student)
+        elif op == 'add_activity':
+            record = entry['record']
+            existing = self.get_activity(record['id'])
+            if existing is not None:
+                self._unindex_activity(existing)
+                existing.update(record)
+                self._index_activity(existing)
+            else:
+                record = dict(record)
+                self.activities.append(record)
+                self._activities_by_id[record['id']] = record
+                self._index_activity(record)
+            self._track_pending(self._pending_activities, self.get_activity(record['id']))
+            self.activities_version += 1
+            self._notify('activity', record['id'], self.get_activity(record['id']))
+        elif op == 'update_activity':
+            activity = self.get_activity(entry['id'])
+            if activity is not None:
+                fields = entry['fields']
+                reindex = 'date' in fields or 'confirmed' in fields
+                if reindex:
+                    self._unindex_activity(activity)
+                activity.update(fields)
+                if reindex:
+                    self._index_activity(activity)
+                self._track_pending(self._pending_activities, activity)
+                self.activities_version += 1
+                self._notify('activity', entry['id'], activity)
+        elif op == 'delete_activity':
+            activity = self._activities_by_id.pop(entry['id'], None)
+            if activity is not None:
+                self._unindex_activity(activity)
+                self._pending_activities.pop(activity['id'], None)
+                self.activities.remove(activity)
+                self.activities_version += 1
+                self._notify('activity', entry['id'], None)
+        elif op == 'add_achievement':
+            record = entry['record']
+            existing = self._achievements_by_id.get(record['id'])
+            if existing is None:
+                # Дубль пары из старого журнала сливается с имеющимся достижением
+                existing = self.get_achievement(record['student_id'], record['event_id'])
+                if existing is not None:
+                    record = achievement_upsert_fields(existing, record) or {}
+            if existing is not None:
+                self._update_achievement_record(existing, record)
+            else:
+                existing = dict(record)
+                self.achievements.append(existing)
+                self._index_achievement(existing)
+            self._track_pending(self._pending_achievements, existing)
+            self._notify('achievement', existing['id'], existing)
+        elif op == 'update_achievement':
+            achievement = self._achievements_by_id.get(entry['id'])
+            if achievement is not None:
+                self._update_achievement_record(achievement, entry['fields'])
+                self._track_pending(self._pending_achievements, achievement)
+                self._notify('achievement', entry['id'], achievement)
+        elif op == 'add_admin':
+            record = entry['record']
+            if not self.is_admin(record['telegram_id']):
+                self.admins.append(dict(record))
+                self._admin_ids.add(str(record['telegram_id']))
+        else:
+            raise ValueError(f"Неизвестная операция журнала: {op}")
+
+    def _update_achievement_record(self, achievement, fields):
+        rekey = 'student_id' in fields or 'event_id' in fields
+        if rekey:
+            self._unindex_achievement(achievement)
+        achievement.update(fields)
+        if rekey:
+            self._index_achievement(achievement)
+
+    # --- Изменение ---
+    # Каждый метод - отдельная транзакция; внутри открытой транзакции
+    # вызов присоединяется к ней. durable=True - записать на диск сразу,
+    # минуя отложенную запись.
+
+    def add_student(self, telegram_id, first_name, last_name, group_number, durable=False):
+        """
+        Добавляет нового студента.
+        """
+        with self.transaction(durable) as tx:
+            tx.add_student(telegram_id, first_name, last_name, group_number)
+        return self.get_student(telegram_id)
+
+    def update_student(self, telegram_id, durable=False, **fields):
+        """
+        Обновляет поля студента.
+        Возвращает обновлённую запись или None, если студент не найден.
+        """
+        with self.transaction(durable) as tx:
+            return tx.update_student(telegram_id, **fields)
+
+    def add_activity(self, activity, durable=False):
+        """
+        Добавляет мероприятие.
+        Дата в неверном формате отклоняется с ValueError.
+        """
+        with self.transaction(durable) as tx:
+            tx.add_activity(activity)
+        return self.get_activity(activity['id'])
+
+    def update_activity(self, event_id, durable=False, **fields):
+        """
+        Обновляет поля мероприятия.
+        Возвращает обновлённую запись или None, если мероприятие не найдено.
+        Дата в неверном формате отклоняется с ValueError.
+        """
+        with self.transaction(durable) as tx:
+            return tx.update_activity(event_id, **fields)
+
+    def delete_activity(self, event_id, durable=False):
+        """
+        Удаляет мероприятие.
+        """
+        with self.transaction(durable) as tx:
+            tx.delete_activity(event_id)
+
+    def add_achievement(self, achievement, durable=False):
+        """
+        Добавляет достижение, выдавая ему id. Если у студента уже есть
+        достижение на этом мероприятии, обновляет его (см. Transaction.add_achievement).
+        Возвращает (запись, результат ACHIEVEMENT_*).
+        """
+        with self.transaction(durable) as tx:
+            achievement_id, outcome = tx.add_achievement(achievement)
+        return self._achievements_by_id.get(achievement_id), outcome
+
+    def update_achievement(self, student_id, event_id, durable=False, **fields):
+        """
+        Обновляет поля достижения.
+        Возвращает обновлённую запись или None, если достижение не найдено.
+        """
+        with self.transaction(durable) as tx:
+            return tx.update_achievement(student_id, event_id, **fields)
+
+    def confirm_pending(self, activity_ids=(), achievement_ids=(), durable=False):
+        """
+        Подтверждает пачку мероприятий и достижений одной транзакцией:
+        одна запись в журнал и один сброс на диск на всю пачку.
+        Уже подтверждённые и не найденные записи пропускаются.
+        Возвращает число подтверждённых записей.
+        """
+        with self.transaction(durable) as tx:
+            confirmed = 0
+            for event_id in dict.fromkeys(activity_ids):
+                if event_id in self._pending_activities:
+                    tx.update_activity(event_id, confirmed=True)
+                    confirmed += 1
+            for achievement_id in dict.fromkeys(achievement_ids):
+                if achievement_id in self._pending_achievements:
+                    tx.update_achievement_by_id(achievement_id, confirmed=True)
+                    confirmed += 1
+        return confirmed
+
+    def add_admin(self, admin, durable=False):
+        """
+        Добавляет администратора.
+        """
+        with self.transaction(durable) as tx:
+            tx.add_admin(admin)
+        return admin
+
+
+class Transaction:
+    """
+    Набор операций, накапливаемых внутри store.transaction().
+    Изменения становятся видны в хранилище после выхода из блока.
+    Методы обновления возвращают живую запись, которая получит новые
+    значения при фиксации транзакции, или None, если запись не найдена.
+    """
+
+    def __init__(self, store, durable=False):
+        self.store = store
+        self.durable = durable
+        self.entries = []
+        # Достижения, добавленные в этой транзакции, по паре (студент, мероприятие)
+        self._staged_achievements = {}
+
+    def _stage(self, op, **args):
+        self.entries.append({'op': op, **args})
+
+    def add_student(self, telegram_id, first_name, last_name, group_number):
+        self._stage('add_student', record={
+            'telegram_id': telegram_id,
+            'first_name': first_name,
+            'last_name': last_name,
+            'group_number': group_number
+        })
+
+    def update_student(self, telegram_id, **fields):
+        student = self.store.get_student(telegram_id)
+        if student is None:
+            return None
+        self._stage('update_student', telegram_id=student['telegram_id'], fields=fields)
+        return student
+
+    def add_activity(self, activity):
+        # Дата проверяется при записи, чтобы не разбирать её при каждом чтении
+        parse_event_date(activity.get('date'))
+        self._stage('add_activity', record=activity)
+
+    def update_activity(self, event_id, **fields):
+        activity = self.store.get_activity(event_id)
+        if activity is None:
+            return None
+        if 'date' in fields:
+            parse_event_date(fields['date'])
+        self._stage('update_activity', id=event_id, fields=fields)
+        return activity
+
+    def delete_activity(self, event_id):
+        if self.store.get_activity(event_id) is not None:
+            self._stage('delete_activity', id=event_id)
+
+    def add_achievement(self, achievement):
+        """
+        Добавляет достижение или, если у студента уже есть достижение
+        на этом мероприятии, обновляет его (upsert).
+        Возвращает (id, результат ACHIEVEMENT_*).
+        """
+        pair = (str(achievement['student_id']), str(achievement['event_id']))
+        existing = self._staged_achievements.get(pair) or self.store.get_achievement(*pair)
+        if existing is None:
+            record = {'id': str(uuid.uuid4()), **achievement}
+            self._stage('add_achievement', record=record)
+            self._staged_achievements[pair] = record
+            return record['id'], ACHIEVEMENT_ADDED
+        fields = achievement_upsert_fields(existing, achievement)
+        if not fields:
+            return existing['id'], ACHIEVEMENT_UNCHANGED
+        was_confirmed = existing.get('confirmed', False)
+        self._stage('update_achievement', id=existing['id'], fields=fields)
+        if was_confirmed and not fields.get('confirmed', False):
+            return existing['id'], ACHIEVEMENT_RESUBMITTED
+        return existing['id'], ACHIEVEMENT_UPDATED
+
+    def update_achievement(self, student_id, event_id, **fields):
+        achievement = self.store.get_achievement(student_id, event_id)
+        if achievement is None:
+            return None
+        self._stage('update_achievement', id=achievement['id'], fields=fields)
+        return achievement
+
+    def update_achievement_by_id(self, achievement_id, **fields):
+        achievement = self.store.get_achievement_by_id(achievement_id)
+        if achievement is None:
+            return None
+        self._stage('update_achievement', id=achievement_id, fields=fields)
+        return achievement
+
+    def add_admin(self, admin):
+        self._stage('add_admin', record=admin)
+
+
+# Единственный экземпляр хранилища на процесс
+store = DataStore(create_backend(), write_behind=WRITE_BEHIND_WINDOW)
 
-def is_user_registered(telegram_id, data):
+def is_user_registered(telegram_id):
     """
     Проверяет, зарегистрирован ли пользователь по его telegram_id.
     """
-    return any(student['telegram_id'] == telegram_id for student in data.get('students', []))
+    return store.get_student(telegram_id) is not None
 
-def add_student(data, telegram_id, first_name, last_name, group_number):
+def add_student(telegram_id, first_name, last_name, group_number):
     """
     Добавляет нового студента в данные и сохраняет их.
     """
-    new_student = {
-        'telegram_id': telegram_id,
-        'first_name': first_name,
-        'last_name': last_name,
-        'group_number': group_number
-    }
-    data.setdefault('students', []).append(new_student)
-    save_data(data)
+    return store.add_student(telegram_id, first_name, last_name, group_number)
@@ -0,0 +1,131 @@
+# dispatcher.py
+"""
+Модуль для параллельной обработки обновлений с сохранением порядка в чате.
+Обновления раскладываются по «полосам» по хешу id чата: у каждой полосы
+своя очередь и свой поток, поэтому сообщения одного пользователя
+обрабатываются строго по очереди (на этом держатся пошаговые диалоги,
+см. conversation_manager.py), а разные чаты - параллельно.
+"""
+
+import queue
+import threading
+import traceback
+
+
+def chat_id_of(update):
+    """
+    Возвращает id чата, к которому относится обновление.
+    Для обновлений без чата используется id пользователя,
+    в крайнем случае - id самого обновления.
+    """
+    for name in ('message', 'edited_message', 'channel_post', 'edited_channel_post'):
+        message = getattr(update, name, None)
+        if message is not None:
+            return message.chat.id
+    callback_query = getattr(update, 'callback_query', None)
+    if callback_query is not None:
+        if callback_query.message is not None:
+            return callback_query.message.chat.id
+        return callback_query.from_user.id
+    for value in vars(update).values():
+        user = getattr(value, 'from_user', None)
+        if user is not None:
+            return user.id
+    return update.update_id
+
+
+class ChatDispatcher:
+    """
+    Раздаёт обновления по полосам-потокам с ограниченной длиной очереди.
+    handle(update) вызывается в потоке полосы.
+    """
+
+    def __init__(self, handle, lanes=8, max_lane_depth=100):
+        self.handle = handle
+        self.lanes = [queue.Queue(maxsize=max_lane_depth) for _ in range(lanes)]
+        self.processed = [0] * lanes
+        self.peak_depths = [0] * lanes
+        self._threads = []
+
+    def lane_of(self, update):
+        return hash(chat_id_of(update)) % len(self.lanes)
+
+    def submit(self, update, block=True):
+        """
+        Ставит обновление в очередь его полосы.
+        При block=True ждёт места в переполненной полосе (так тормозится
+        long polling), при block=False сразу возвращает False.
+        """
+        index = self.lane_of(update)
+        lane = self.lanes[index]
+        try:
+            lane.put(update, block=block)
+        except queue.Full:
+            return False
+        self.peak_depths[index] = max(self.peak_depths[index], lane.qsize())
+        return True
+
+    def stats(self):
+        """
+        Метрики полос: текущая длина очереди, максимальная длина
+        и число обработанных обновлений.
+        """
+        return [
+            {'lane': index, 'depth': lane.qsize(), 'peak': self.peak_depths[index], 'processed': self.processed[index]}
+            for index, lane in enumerate(self.lanes)
+        ]
+
+    def _work(self, index):
+        lane = self.lanes[index]
+        while True:
+            update = lane.get()
+            if update is None:
+                break
+            try:
+                self.handle(update)
+            except Exception as e:
+                print(f"Ошибка при обработке обновления {update.update_id}: {e}")
+                traceback.print_exc()
+            finally:
+                self.processed[index] += 1
+                lane.task_done()
+
+    def start(self):
+        """
+        Запускает потоки полос.
+        """
+        for index in range(len(self.lanes)):
+            thread = threading.Thread(target=self._work, args=(index,), daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        """
+        Дожидается обработки уже принятых обновлений и останавливает потоки.
+        """
+        for lane in self.lanes:
+            lane.put(None)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+
+def install(bot, lanes, max_lane_depth):
+    """
+    Подключает диспетчер к боту: bot.process_new_updates начинает
+    раздавать обновления по полосам, а хендлеры выполняются в их потоках.
+    Бот должен быть создан с threaded=False.
+    Потоки полос запускает dispatcher.start().
+    """
+    process_updates = bot.process_new_updates
+    dispatcher = ChatDispatcher(lambda update: process_updates([update]), lanes, max_lane_depth)
+
+    def dispatch_updates(updates):
+        # Смещение для getUpdates двигаем сразу, не дожидаясь обработки,
+        # иначе следующий запрос polling'а вернёт те же обновления
+        for update in updates:
+            bot.last_update_id = max(bot.last_update_id, update.update_id)
+            dispatcher.submit(update)
+
+    bot.process_new_updates = dispatch_updates
+    return dispatcher
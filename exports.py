@@ -0,0 +1,198 @@
+# exports.py
+"""
+Модуль для выгрузки отчётов администратора в файлы CSV и XLSX.
+Строки отчёта по одной берутся из генератора по индексам хранилища
+и сразу пишутся в файл, поэтому отчёт целиком в памяти не собирается.
+Файл до EXPORT_SPOOL_SIZE байт живёт в памяти, больше - на диске.
+
+    rows = event_rows(ExportFilter(level="региональный"))
+    document = write_export(rows, "csv")
+    bot.send_document(chat_id, document, visible_file_name="events.csv")
+
+Формат XLSX доступен, если установлен openpyxl.
+"""
+
+import csv
+import shlex
+import tempfile
+from collections import namedtuple
+
+from config import EXPORT_SPOOL_SIZE
+from data_manager import store, parse_event_date
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # XLSX - необязательная возможность
+    Workbook = None
+
+EXPORT_FORMATS = ('csv', 'xlsx') if Workbook is not None else ('csv',)
+
+EVENT_COLUMNS = (
+    "Мероприятие", "Дата", "Место", "Уровень", "Категория",
+    "Имя", "Фамилия", "Группа", "Место в итогах",
+)
+USER_COLUMNS = (
+    "Имя", "Фамилия", "Группа",
+    "Мероприятие", "Дата", "Уровень", "Категория", "Место в итогах",
+)
+
+ExportFilter = namedtuple('ExportFilter', 'start end level category group', defaults=(None,) * 5)
+
+# Ключи фильтров в команде /export
+FILTER_KEYS = {'from': 'start', 'to': 'end', 'level': 'level', 'category': 'category', 'group': 'group'}
+
+
+def parse_export_args(text):
+    """
+    Разбирает аргументы команды /export:
+    "<events|users> [csv|xlsx] [from=ГГГГ-ММ-ДД] [to=ГГГГ-ММ-ДД]
+    [level=...] [category=...] [group=...]".
+    Значения с пробелами берутся в кавычки.
+    Возвращает (отчёт, формат, ExportFilter), при ошибке - ValueError.
+    """
+    try:
+        words = shlex.split(text)
+    except ValueError:
+        raise ValueError("незакрытая кавычка")
+    if not words or words[0] not in ('events', 'users'):
+        raise ValueError("укажите отчёт: events или users")
+    report, words = words[0], words[1:]
+    export_format = 'csv'
+    if words and '=' not in words[0]:
+        export_format, words = words[0].lower(), words[1:]
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"формат {export_format} недоступен, есть: {', '.join(EXPORT_FORMATS)}")
+
+    filters = {}
+    for word in words:
+        key, sep, value = word.partition('=')
+        if not sep or key not in FILTER_KEYS:
+            raise ValueError(f"неизвестный фильтр {word}")
+        field = FILTER_KEYS[key]
+        if field in ('start', 'end'):
+            try:
+                value = parse_event_date(value)
+            except ValueError:
+                raise ValueError(f"неверная дата {value}, нужен формат ГГГГ-ММ-ДД")
+        filters[field] = value
+    return report, export_format, ExportFilter(**filters)
+
+
+def _matches(value, expected):
+    return expected is None or str(value or '').strip().lower() == expected.strip().lower()
+
+
+def _kind_matches(event, filters):
+    return _matches(event.get('event_level'), filters.level) and \
+        _matches(event.get('event_category'), filters.category)
+
+
+def _date_matches(event, filters):
+    if filters.start is None and filters.end is None:
+        return True
+    try:
+        event_date = parse_event_date(event['date'])
+    except ValueError:
+        return False
+    return (filters.start is None or event_date >= filters.start) and \
+        (filters.end is None or event_date <= filters.end)
+
+
+def _filtered_activities(filters):
+    """
+    Подтверждённые мероприятия в порядке дат с учётом фильтров.
+    Без фильтра по датам в конец добавляются мероприятия с неверной датой.
+    """
+    activities = store.activities_between(filters.start, filters.end)
+    if filters.start is None and filters.end is None:
+        activities += [a for a in store.undated_activities() if a.get('confirmed', False)]
+    for event in activities:
+        if _kind_matches(event, filters):
+            yield event
+
+
+def event_rows(filters=ExportFilter()):
+    """
+    Строки отчёта по мероприятиям: по строке на участника.
+    Мероприятие без участников даёт строку без участника,
+    если не задан фильтр по группе.
+    """
+    yield EVENT_COLUMNS
+    for event in _filtered_activities(filters):
+        event_part = (
+            event['title'], event['date'], event.get('location', ''),
+            event.get('event_level', ''), event.get('event_category', ''),
+        )
+        found = False
+        for achievement in store.achievements_for_event(event['id']):
+            student = store.get_student(achievement['student_id'])
+            if student and _matches(student.get('group_number'), filters.group):
+                found = True
+                yield event_part + (
+                    student['first_name'], student['last_name'],
+                    student['group_number'], achievement['place'],
+                )
+        if not found and filters.group is None:
+            yield event_part + ('', '', '', '')
+
+
+def user_rows(filters=ExportFilter()):
+    """
+    Строки отчёта по пользователям: по строке на достижение.
+    Пользователь без достижений даёт строку без мероприятия,
+    если не заданы фильтры по мероприятиям.
+    """
+    event_filtered = any(value is not None for value in filters[:4])
+    yield USER_COLUMNS
+    for student in store.students:
+        if not _matches(student.get('group_number'), filters.group):
+            continue
+        student_part = (student['first_name'], student['last_name'], student['group_number'])
+        found = False
+        for achievement in store.achievements_for_student(student['telegram_id']):
+            event = store.get_activity(achievement['event_id'])
+            if not event or not (_date_matches(event, filters) and _kind_matches(event, filters)):
+                continue
+            found = True
+            yield student_part + (
+                event['title'], event['date'], event.get('event_level', ''),
+                event.get('event_category', ''), achievement['place'],
+            )
+        if not found and not event_filtered:
+            yield student_part + ('', '', '', '', '')
+
+
+class _EncodingWriter:
+    """
+    Текстовая обёртка для csv.writer над двоичным файлом.
+    """
+
+    def __init__(self, file, encoding):
+        self.file = file
+        self.encoding = encoding
+
+    def write(self, text):
+        return self.file.write(text.encode(self.encoding))
+
+
+def write_export(rows, export_format='csv'):
+    """
+    Пишет строки в файл CSV или XLSX.
+    Возвращает временный файл, перемотанный в начало.
+    """
+    document = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    if export_format == 'xlsx':
+        if Workbook is None:
+            raise ValueError("для XLSX нужен пакет openpyxl")
+        # В режиме write_only строки листа не копятся в памяти
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet("Отчет")
+        for row in rows:
+            sheet.append(row)
+        workbook.save(document)
+    else:
+        # BOM, чтобы Excel открыл кириллицу без настройки кодировки
+        document.write('\ufeff'.encode('utf-8'))
+        csv.writer(_EncodingWriter(document, 'utf-8'), delimiter=';').writerows(rows)
+    document.seek(0)
+    return document
@@ -1,43 +1,62 @@
 # handlers/events.py
 
 import uuid
-from datetime import datetime
+from datetime import date, datetime
 from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
-from bot_instance import bot
-from data_manager import load_data, save_data
+from bot_instance import bot, pdf_renderer
+from conversation_manager import conversation_step, next_step
+from data_manager import (
+    store, parse_event_date,
+    ACHIEVEMENT_ADDED, ACHIEVEMENT_RESUBMITTED, ACHIEVEMENT_UNCHANGED,
+)
 from handlers.statistics import send_statistics_options
-
-@bot.callback_query_handler(func=lambda call: call.data == "show_achievements")
+from keyboards import activities_keyboard
+from menus import get_menu, back_markup
+from navigation import show_screen
+from pdf_reports import PDF_QUEUED, PDF_DUPLICATE
+from callback_codec import encode_callback, decode_callback, answer_expired
+from callback_router import router
+
+@router.on("show_achievements")
+@router.on_prefix("ach_page:")
 def show_achievements(call):
     """
     Обрабатывает команду "Похвастаться" для регистрации достижения.
+    Мероприятия показываются по страницам в порядке дат.
     """
     bot.answer_callback_query(call.id)
     telegram_id = call.from_user.id
-    data = load_data()
-    student = next((s for s in data.get('students', []) if s['telegram_id'] == telegram_id), None)
+    student = store.get_student(telegram_id)
     if student:
-        past_events = [a for a in data.get('activities', []) if a.get('confirmed', False)]
-        if past_events:
+        page, markup = activities_keyboard(
+            "ach_page",
+            lambda event: InlineKeyboardButton(
+                event['title'], callback_data=encode_callback("select_event", event['id'])
+            ),
+            call.data
+        )
+        if page.items:
             text = "Выберите мероприятие, в котором вы участвовали:\n\n"
-            markup = InlineKeyboardMarkup(row_width=1)
-            for event in past_events:
-                markup.add(InlineKeyboardButton(event['title'], callback_data=f"select_event_{event['id']}"))
-            bot.send_message(call.message.chat.id, text, reply_markup=markup)
+            show_screen(bot, call, text, markup)
         else:
             bot.send_message(call.message.chat.id, "Нет мероприятий для выбора.")
     else:
         bot.send_message(call.message.chat.id, "Пожалуйста, сначала зарегистрируйтесь.")
 
-@bot.callback_query_handler(func=lambda call: call.data.startswith("select_event_"))
+@router.on_prefix("select_event:")
 def select_event(call):
     """
     Обрабатывает выбор мероприятия для добавления достижения.
     """
-    event_id = call.data.split("_")[-1]
-    msg = bot.send_message(call.message.chat.id, "Введите место, которое вы заняли (1-е, 2-е, 3-е место и т.д.):")
-    bot.register_next_step_handler(msg, get_achievement_result, event_id)
+    args = decode_callback(call.data)
+    if args is None:
+        answer_expired(bot, call)
+        return
+    event_id = args[0]
+    show_screen(bot, call, "Введите место, которое вы заняли (1-е, 2-е, 3-е место и т.д.):")
+    next_step(call.message.chat.id, get_achievement_result, event_id=event_id)
 
+@conversation_step
 def get_achievement_result(message, event_id):
     """
     Получает результат достижения от пользователя и сохраняет его.
@@ -45,7 +64,7 @@ def get_achievement_result(message, event_id):
     place = message.text.strip()
     if not place:
         msg = bot.send_message(message.chat.id, "Место не может быть пустым. Пожалуйста, введите место:")
-        bot.register_next_step_handler(msg, get_achievement_result, event_id)
+        next_step(msg.chat.id, get_achievement_result, event_id=event_id)
         return
     telegram_id = message.from_user.id
     achievement = {
@@ -55,72 +74,31 @@ def get_achievement_result(message, event_id):
         'date': datetime.now().isoformat(),
         'confirmed': False
     }
-    data = load_data()
-    data.setdefault('achievements', []).append(achievement)
-    save_data(data)
-    bot.send_message(message.chat.id, "Ваше достижение успешно передано администрации!")
-    send_statistics_options(message)
-
-
-import io
-from fpdf import FPDF
-import os
-
-
-# Добавим функцию для генерации PDF
-def generate_pdf(events):
-    pdf = FPDF()
-    pdf.add_page()
-
-    # Путь к шрифту
-    font_path = os.path.join(os.path.dirname(__file__), 'fonts', 'DejaVuSans.ttf')
-
-    # Проверяем, существует ли файл шрифта
-    if not os.path.exists(font_path):
-        raise FileNotFoundError(f"Шрифт не найден: {font_path}")
-
-    # Добавляем шрифт с поддержкой кириллицы (нужен файл DejaVuSans.ttf в директории)
-    pdf.add_font('DejaVu', '', font_path, uni=True)
-    pdf.set_font('DejaVu', '', 12)
-
-    pdf.cell(200, 10, txt="Ваши мероприятия", ln=1, align='C')
-
-    for event in events:
-        title = event.get('title', 'Без названия')
-        description = event.get('description', 'Описание отсутствует')
-        date = event.get('date', 'Дата не указана')
-        level = event.get('event_level', 'Не указан')
-        category = event.get('event_category', 'Не указана')
-
-        text = (
-            f"Название: {title}\n"
-            f"Описание: {description}\n"
-            f"Дата: {date}\n"
-            f"Уровень: {level}\n"
-            f"Категория: {category}\n\n"
+    _, outcome = store.add_achievement(achievement)
+    if outcome == ACHIEVEMENT_ADDED:
+        bot.send_message(message.chat.id, "Ваше достижение успешно передано администрации!")
+    elif outcome == ACHIEVEMENT_UNCHANGED:
+        bot.send_message(message.chat.id, "Это достижение уже отправлено с тем же местом - изменений нет.")
+    elif outcome == ACHIEVEMENT_RESUBMITTED:
+        bot.send_message(
+            message.chat.id,
+            "Место изменено. Достижение было подтверждено, теперь оно снова отправлено на проверку администрации."
         )
-        pdf.multi_cell(0, 10, txt=text)
-
-    return pdf.output(dest='S').encode('latin1')
+    else:
+        bot.send_message(message.chat.id, "Достижение на этом мероприятии уже было отправлено - место обновлено.")
+    send_statistics_options(message)
 
 
-@bot.callback_query_handler(func=lambda call: call.data == "my_events")
+@router.on("my_events")
 def show_my_events(call):
     bot.answer_callback_query(call.id)
     telegram_id = call.from_user.id
-    data = load_data()
-
-    student = next((s for s in data.get('students', []) if s['telegram_id'] == telegram_id), None)
+    student = store.get_student(telegram_id)
     if not student:
         bot.send_message(call.message.chat.id, "Пожалуйста, сначала зарегистрируйтесь.")
         return
 
-    achievements = [ach for ach in data.get('achievements', []) if ach['student_id'] == student['telegram_id']]
-    events = []
-    for ach in achievements:
-        event = next((e for e in data.get('activities', []) if e['id'] == ach['event_id']), None)
-        if event:
-            events.append(event)
+    events = store.student_events(student['telegram_id'])
 
     if not events:
         events_text = "У вас пока нет зарегистрированных мероприятий."
@@ -135,95 +113,77 @@ def show_my_events(call):
                 f"Категория: {event.get('event_category', 'Не указана')}\n\n"
             )
 
-    markup = InlineKeyboardMarkup(row_width=1)
     if events:
+        markup = InlineKeyboardMarkup(row_width=1)
         markup.add(
             InlineKeyboardButton("Скачать PDF", callback_data="generate_pdf"),
             InlineKeyboardButton("Назад", callback_data="back_to_statistics")
         )
     else:
-        markup.add(InlineKeyboardButton("Назад", callback_data="back_to_statistics"))
+        markup = back_markup("back_to_statistics")
 
-    bot.send_message(call.message.chat.id, events_text, reply_markup=markup)
+    show_screen(bot, call, events_text, markup)
 
 
 # Обработчик для генерации PDF
-@bot.callback_query_handler(func=lambda call: call.data == "generate_pdf")
+@router.on("generate_pdf")
 def handle_generate_pdf(call):
-    bot.answer_callback_query(call.id)
+    """
+    Ставит PDF со списком мероприятий студента в очередь генерации.
+    Документ придёт отдельным сообщением, когда будет готов.
+    """
     telegram_id = call.from_user.id
-    data = load_data()
-
-    student = next((s for s in data.get('students', []) if s['telegram_id'] == telegram_id), None)
+    student = store.get_student(telegram_id)
     if not student:
+        bot.answer_callback_query(call.id)
         bot.send_message(call.message.chat.id, "Пользователь не найден.")
         return
 
-    achievements = [ach for ach in data.get('achievements', []) if ach['student_id'] == student['telegram_id']]
-    events = []
-    for ach in achievements:
-        event = next((e for e in data.get('activities', []) if e['id'] == ach['event_id']), None)
-        if event:
-            events.append(event)
-
+    events = store.student_events(student['telegram_id'])
     if not events:
+        bot.answer_callback_query(call.id)
         bot.send_message(call.message.chat.id, "Нет мероприятий для генерации PDF.")
         return
 
-    try:
-        # Генерируем PDF
-        pdf_output = generate_pdf(events)
-        # Создаем файловый объект в памяти
-        pdf_file = io.BytesIO(pdf_output)
-        pdf_file.seek(0)
-        pdf_file.name = "my_events.pdf"
-
-        # Отправляем документ
-        bot.send_document(
-            chat_id=call.message.chat.id,
-            document=pdf_file,
-            caption="Список ваших мероприятий"
-        )
-    except Exception as e:
-        print(f"Ошибка при генерации PDF: {e}")
-        bot.send_message(call.message.chat.id, "Произошла ошибка при генерации отчета.")
+    status = pdf_renderer.submit(telegram_id, call.message.chat.id, events)
+    if status == PDF_QUEUED:
+        bot.answer_callback_query(call.id, "Готовим PDF, он придёт следующим сообщением.")
+    elif status == PDF_DUPLICATE:
+        bot.answer_callback_query(call.id, "PDF уже готовится.")
+    else:
+        bot.answer_callback_query(call.id, "Сейчас много запросов, попробуйте чуть позже.")
 
-@bot.callback_query_handler(func=lambda call: call.data == "upcoming_events")
+@router.on("upcoming_events")
 def handle_upcoming_events(call):
     """
     Обрабатывает команду для отображения меню мероприятий.
     """
     bot.answer_callback_query(call.id)
-    markup = InlineKeyboardMarkup(row_width=1)
-    markup.add(
-        InlineKeyboardButton("Узнать о предстоящих мероприятиях", callback_data="get_events"),
-        InlineKeyboardButton("Сообщить о мероприятии", callback_data="report_event"),
-        InlineKeyboardButton("Назад", callback_data="back_to_welcome")
-    )
-    bot.send_message(call.message.chat.id, "Так, куда дальше? Выбирай ниже 👇", reply_markup=markup)
+    menu = get_menu("events")
+    show_screen(bot, call, menu.text, menu.markup)
 
-@bot.callback_query_handler(func=lambda call: call.data == "get_events")
-def get_events(call):
+# Кэш текста списка предстоящих мероприятий.
+# Текст одинаков для всех студентов и меняется, только когда меняются
+# мероприятия (store.activities_version) или наступает новый день.
+_upcoming_events_cache = {}
+
+def render_upcoming_events():
     """
-    Отображает список предстоящих мероприятий.
+    Возвращает текст списка предстоящих мероприятий из кэша,
+    собирая его заново только после изменения данных или смены даты.
     """
-    data = load_data()
-    activities = data.get('activities', [])
-    current_date = datetime.now()
-    upcoming_events = []
-    for event in activities:
-        try:
-            event_date = datetime.strptime(event['date'], '%Y-%m-%d')
-            if event.get('confirmed', False) and event_date >= current_date:
-                upcoming_events.append(event)
-        except ValueError:
-            continue
+    key = (store.activities_version, date.today())
+    events_text = _upcoming_events_cache.get(key)
+    if events_text is not None:
+        return events_text
+
+    upcoming_events = store.upcoming_activities()
     if not upcoming_events:
         events_text = "На данный момент предстоящих мероприятий нет."
     else:
-        events_text = "Предстоящие мероприятия:\n\n"
+        parts = ["Предстоящие мероприятия:\n\n"]
         for event in upcoming_events:
-            events_text += (
+            parts.append(
                 f"Название: {event['title']}\n"
                 f"Описание: {event['description']}\n"
                 f"Дата: {event['date']}\n"
@@ -232,19 +192,30 @@ def get_events(call):
                 f"Категория: {event.get('event_category', 'Не указана')}\n"
                 f"Ссылка на опросник: {event.get('survey_link', 'Нет ссылки')}\n\n"
             )
-    markup = InlineKeyboardMarkup(row_width=1)
-    markup.add(InlineKeyboardButton("Назад", callback_data="back_to_upcoming_events"))
-    bot.send_message(call.message.chat.id, events_text.strip(), reply_markup=markup)
+        events_text = "".join(parts).strip()
+
+    # Старые версии больше не понадобятся
+    _upcoming_events_cache.clear()
+    _upcoming_events_cache[key] = events_text
+    return events_text
 
-@bot.callback_query_handler(func=lambda call: call.data == "report_event")
+@router.on("get_events")
+def get_events(call):
+    """
+    Отображает список предстоящих мероприятий.
+    """
+    show_screen(bot, call, render_upcoming_events(), back_markup("back_to_upcoming_events"))
+
+@router.on("report_event")
 def report_event(call):
     """
     Запускает процесс подачи информации о новом мероприятии.
     """
     bot.answer_callback_query(call.id)
-    msg = bot.send_message(call.message.chat.id, "Введите название мероприятия:")
-    bot.register_next_step_handler(msg, get_activity_description_title)
+    show_screen(bot, call, "Введите название мероприятия:")
+    next_step(call.message.chat.id, get_activity_description_title)
 
+@conversation_step
 def get_activity_description_title(message):
     """
     Получает название мероприятия от пользователя.
@@ -252,33 +223,46 @@ def get_activity_description_title(message):
     activity_title = message.text.strip()
     if not activity_title:
         msg = bot.send_message(message.chat.id, "Название мероприятия не может быть пустым. Пожалуйста, введите название:")
-        bot.register_next_step_handler(msg, get_activity_description_title)
+        next_step(msg.chat.id, get_activity_description_title)
         return
     msg = bot.send_message(message.chat.id, "Введите описание мероприятия:")
-    bot.register_next_step_handler(msg, get_activity_description, activity_title)
+    next_step(msg.chat.id, get_activity_description, activity_title=activity_title)
 
+@conversation_step
 def get_activity_description(message, activity_title):
     """
     Получает описание мероприятия.
     """
     activity_description = message.text.strip()
     msg = bot.send_message(message.chat.id, "Введите дату проведения мероприятия (ГГГГ-ММ-ДД):")
-    bot.register_next_step_handler(msg, get_activity_date, activity_title, activity_description)
+    next_step(
+        msg.chat.id, get_activity_date,
+        activity_title=activity_title, activity_description=activity_description
+    )
 
+@conversation_step
 def get_activity_date(message, activity_title, activity_description):
     """
     Получает дату проведения мероприятия и проверяет формат.
     """
     activity_date = message.text.strip()
     try:
-        datetime.strptime(activity_date, '%Y-%m-%d')
+        parse_event_date(activity_date)
     except ValueError:
         msg = bot.send_message(message.chat.id, "Неверный формат даты. Пожалуйста, введите дату в формате ГГГГ-ММ-ДД:")
-        bot.register_next_step_handler(msg, get_activity_date, activity_title, activity_description)
+        next_step(
+            msg.chat.id, get_activity_date,
+            activity_title=activity_title, activity_description=activity_description
+        )
         return
     msg = bot.send_message(message.chat.id, "Введите место проведения мероприятия:")
-    bot.register_next_step_handler(msg, get_activity_location, activity_title, activity_description, activity_date)
+    next_step(
+        msg.chat.id, get_activity_location,
+        activity_title=activity_title, activity_description=activity_description,
+        activity_date=activity_date
+    )
 
+@conversation_step
 def get_activity_location(message, activity_title, activity_description, activity_date):
     """
     Получает место проведения мероприятия.
@@ -286,14 +270,20 @@ def get_activity_location(message, activity_title, activity_description, activit
     activity_location = message.text.strip()
     if not activity_location:
         msg = bot.send_message(message.chat.id, "Место проведения не может быть пустым. Пожалуйста, введите место:")
-        bot.register_next_step_handler(msg, get_activity_location, activity_title, activity_description, activity_date)
+        next_step(
+            msg.chat.id, get_activity_location,
+            activity_title=activity_title, activity_description=activity_description,
+            activity_date=activity_date
+        )
         return
     msg = bot.send_message(message.chat.id, "Введите ссылку на опросник для мероприятия:")
-    bot.register_next_step_handler(
-        msg, get_event_level,
-        activity_title, activity_description, activity_date, activity_location
+    next_step(
+        msg.chat.id, get_event_level,
+        activity_title=activity_title, activity_description=activity_description,
+        activity_date=activity_date, activity_location=activity_location
     )
 
+@conversation_step
 def get_event_level(message, activity_title, activity_description, activity_date, activity_location):
     """
     Запрашивает уровень мероприятия (локальный, региональный, всероссийский, международный).
@@ -301,7 +291,11 @@ def get_event_level(message, activity_title, activity_description, activity_date
     survey_link = message.text.strip()
     if not survey_link:
         msg = bot.send_message(message.chat.id, "Ссылка на опросник не может быть пустой. Пожалуйста, введите ссылку:")
-        bot.register_next_step_handler(msg, get_event_level, activity_title, activity_description, activity_date, activity_location)
+        next_step(
+            msg.chat.id, get_event_level,
+            activity_title=activity_title, activity_description=activity_description,
+            activity_date=activity_date, activity_location=activity_location
+        )
         return
 
     # Сохраняем survey_link, продолжаем запрос уровня
@@ -309,11 +303,13 @@ def get_event_level(message, activity_title, activity_description, activity_date
         message.chat.id,
         "Введите уровень мероприятия (например, локальный, региональный, всероссийский, международный):"
     )
-    bot.register_next_step_handler(
-        msg, get_event_category,
-        activity_title, activity_description, activity_date, activity_location, survey_link
+    next_step(
+        msg.chat.id, get_event_category,
+        activity_title=activity_title, activity_description=activity_description,
+        activity_date=activity_date, activity_location=activity_location, survey_link=survey_link
     )
 
+@conversation_step
 def get_event_category(message, activity_title, activity_description, activity_date, activity_location, survey_link):
     """
     Запрашивает категорию мероприятия (например, научная конференция, олимпиада, спортивное, и т. д.).
@@ -321,9 +317,11 @@ def get_event_category(message, activity_title, activity_description, activity_d
     event_level = message.text.strip()
     if not event_level:
         msg = bot.send_message(message.chat.id, "Уровень мероприятия не может быть пустым. Пожалуйста, введите уровень:")
-        bot.register_next_step_handler(
-            msg, get_event_category,
-            activity_title, activity_description, activity_date, activity_location, survey_link
+        next_step(
+            msg.chat.id, get_event_category,
+            activity_title=activity_title, activity_description=activity_description,
+            activity_date=activity_date, activity_location=activity_location,
+            survey_link=survey_link
         )
         return
 
@@ -331,11 +329,14 @@ def get_event_category(message, activity_title, activity_description, activity_d
         message.chat.id,
         "Введите категорию мероприятия (например, научная конференция, олимпиада, спортивное и т. д.):"
     )
-    bot.register_next_step_handler(
-        msg, save_activity_with_survey,
-        activity_title, activity_description, activity_date, activity_location, survey_link, event_level
+    next_step(
+        msg.chat.id, save_activity_with_survey,
+        activity_title=activity_title, activity_description=activity_description,
+        activity_date=activity_date, activity_location=activity_location, survey_link=survey_link,
+        event_level=event_level
     )
 
+@conversation_step
 def save_activity_with_survey(message, activity_title, activity_description, activity_date, activity_location, survey_link, event_level):
     """
     Сохраняет всю информацию о мероприятии, включая ссылку, уровень и категорию.
@@ -343,9 +344,11 @@ def save_activity_with_survey(message, activity_title, activity_description, act
     event_category = message.text.strip()
     if not event_category:
         msg = bot.send_message(message.chat.id, "Категория мероприятия не может быть пустой. Пожалуйста, введите категорию:")
-        bot.register_next_step_handler(
-            msg, save_activity_with_survey,
-            activity_title, activity_description, activity_date, activity_location, survey_link, event_level
+        next_step(
+            msg.chat.id, save_activity_with_survey,
+            activity_title=activity_title, activity_description=activity_description,
+            activity_date=activity_date, activity_location=activity_location,
+            survey_link=survey_link, event_level=event_level
         )
         return
 
@@ -361,22 +364,20 @@ def save_activity_with_survey(message, activity_title, activity_description, act
         'confirmed': False,
         'submitter_id': message.from_user.id
     }
-    data = load_data()
-    data.setdefault('activities', []).append(new_activity)
-    save_data(data)
+    store.add_activity(new_activity)
     bot.send_message(message.chat.id, "Информация о мероприятии успешно сохранена и ожидает подтверждения.")
 
-@bot.callback_query_handler(func=lambda call: call.data == "back_to_upcoming_events")
+@router.on("back_to_upcoming_events")
 def back_to_upcoming_events(call):
     """
     Обрабатывает кнопку "Назад" в меню предстоящих мероприятий.
     """
     handle_upcoming_events(call)
 
-@bot.callback_query_handler(func=lambda call: call.data == "back_to_welcome")
+@router.on("back_to_welcome")
 def handle_back_to_welcome(call):
     """
     Возвращает пользователя к главному меню.
     """
-    from handlers.main_handlers import send_welcome
-    send_welcome(call.message)
+    menu = get_menu("welcome")
+    show_screen(bot, call, menu.text, menu.markup)
@@ -0,0 +1,67 @@
+# handlers/leaderboard.py
+"""
+Модуль с экранами рейтинга студентов: общий рейтинг и рейтинг группы.
+Места и баллы берутся из поддерживаемого рейтинга (leaderboard.py).
+"""
+
+from bot_instance import bot
+from callback_router import router
+from data_manager import store
+from leaderboard import leaderboard
+from menus import get_menu
+from navigation import show_screen
+
+TOP_SIZE = 10
+
+
+def render_leaderboard(title, telegram_id, group=None):
+    """
+    Собирает текст рейтинга: первые TOP_SIZE студентов и место пользователя.
+    """
+    lines = [title, ""]
+    top = leaderboard.top(TOP_SIZE, group)
+    if not top:
+        lines.append("Пока никто не набрал баллов.")
+    place, previous = 0, None
+    for index, (student_id, score) in enumerate(top, start=1):
+        # Равные баллы делят место, как в leaderboard.rank
+        if score != previous:
+            place, previous = index, score
+        student = store.get_student(student_id) or {}
+        name = f"{student.get('first_name', '')} {student.get('last_name', '')}".strip() or "Без имени"
+        suffix = "" if group is not None else f" ({student.get('group_number', '')})"
+        lines.append(f"{place}. {name}{suffix} - {score}")
+
+    rank = leaderboard.rank(telegram_id, group)
+    lines.append("")
+    if rank is None:
+        lines.append("У вас пока нет баллов: они начисляются за подтверждённые достижения.")
+    else:
+        place, total, score = rank
+        lines.append(f"Ваше место: {place} из {total}, баллов: {score}")
+    return "\n".join(lines)
+
+@router.on("leaderboard")
+def handle_leaderboard(call):
+    """
+    Показывает общий рейтинг студентов.
+    """
+    bot.answer_callback_query(call.id)
+    menu = get_menu("leaderboard")
+    text = render_leaderboard(menu.text, call.from_user.id)
+    show_screen(bot, call, text, menu.markup)
+
+@router.on("leaderboard_group")
+def handle_group_leaderboard(call):
+    """
+    Показывает рейтинг группы пользователя.
+    """
+    bot.answer_callback_query(call.id)
+    student = store.get_student(call.from_user.id)
+    if not student:
+        bot.send_message(call.message.chat.id, "Пожалуйста, сначала зарегистрируйтесь.")
+        return
+    menu = get_menu("leaderboard_group")
+    group = student['group_number']
+    text = render_leaderboard(menu.text.format(group=group), call.from_user.id, group)
+    show_screen(bot, call, text, menu.markup)
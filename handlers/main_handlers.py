@@ -3,9 +3,9 @@
 Модуль с основными обработчиками команд, такими как /start.
 """
 
-from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
 from bot_instance import bot
-from ru import WELCOME_TEXT
+from data_manager import store, DELIVERY_ACTIVE
+from menus import get_menu
 from handlers.statistics import send_statistics_options
 from handlers.registration import start_registration
 
@@ -13,16 +13,17 @@ def send_welcome(message):
     """
     Отправляет приветственное сообщение с основным меню.
     """
-    markup = InlineKeyboardMarkup(row_width=1)
-    markup.add(
-        InlineKeyboardButton("Моя статистика", callback_data="my_statistics"),
-        InlineKeyboardButton("Известные мероприятия", callback_data="upcoming_events")
-    )
-    bot.send_message(message.chat.id, WELCOME_TEXT, reply_markup=markup)
+    menu = get_menu("welcome")
+    bot.send_message(message.chat.id, menu.text, reply_markup=menu.markup)
 
 @bot.message_handler(commands=['start'])
 def handle_start(message):
     """
     Обработчик команды /start.
+    Если пользователь ранее был помечен как недоступный для рассылок
+    (например, блокировал бота), снова включает ему рассылки.
     """
+    student = store.get_student(message.from_user.id)
+    if student and student.get('delivery_status', DELIVERY_ACTIVE) != DELIVERY_ACTIVE:
+        store.update_student(message.from_user.id, delivery_status=DELIVERY_ACTIVE)
     send_welcome(message)
@@ -4,40 +4,43 @@
 """
 
 from bot_instance import bot
+from conversation_manager import conversation_step, next_step
 
-from data_manager import load_data, add_student
+from data_manager import add_student
 
 def start_registration(message):
     """
     Инициирует процесс регистрации пользователя.
     """
     msg = bot.send_message(message.chat.id, "Введите ваше имя:")
-    bot.register_next_step_handler(msg, get_last_name)
+    next_step(msg.chat.id, get_last_name)
 
+@conversation_step
 def get_last_name(message):
     """
     Получает имя пользователя и запрашивает фамилию.
     """
     first_name = message.text.strip()
     msg = bot.send_message(message.chat.id, "Введите вашу фамилию:")
-    bot.register_next_step_handler(msg, get_group_number, first_name)
+    next_step(msg.chat.id, get_group_number, first_name=first_name)
 
+@conversation_step
 def get_group_number(message, first_name):
     """
     Получает фамилию и запрашивает номер группы.
     """
     last_name = message.text.strip()
     msg = bot.send_message(message.chat.id, "Введите номер группы:")
-    bot.register_next_step_handler(msg, complete_registration, first_name, last_name)
+    next_step(msg.chat.id, complete_registration, first_name=first_name, last_name=last_name)
 
+@conversation_step
 def complete_registration(message, first_name, last_name):
     """
     Завершает регистрацию, сохраняя данные пользователя.
     """
     group_number = message.text.strip()
     telegram_id = message.from_user.id
-    data = load_data()
-    add_student(data, telegram_id, first_name, last_name, group_number)
+    add_student(telegram_id, first_name, last_name, group_number)
     bot.send_message(message.chat.id, "Вы успешно зарегистрированы!")
 
     from handlers.statistics import send_statistics_options
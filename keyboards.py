@@ -0,0 +1,74 @@
+# keyboards.py
+"""
+Модуль с постраничными клавиатурами списков мероприятий.
+Страницы строятся по индексу дат хранилища (DataStore.activities_page)
+с курсорами вместо номеров страниц: кнопки «назад»/«вперёд» несут
+позицию (дата, id) крайнего мероприятия, поэтому страница стоит
+O(размер страницы) и не съезжает, если список изменился.
+Страницы показываются на месте сообщения со списком
+(см. navigation.show_screen).
+
+Направление и курсор кнопок навигации хранятся в таблице токенов
+(см. callback_codec.py), в callback_data - только "<префикс>:<токен>".
+"""
+
+from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton
+
+from callback_codec import encode_callback, decode_callback
+from data_manager import store
+
+PAGE_SIZE = 5
+
+
+def page_callback(prefix, direction, position):
+    """
+    Собирает callback_data кнопки перехода на соседнюю страницу.
+    """
+    return encode_callback(prefix, direction, position)
+
+
+def is_page_callback(prefix, data):
+    """
+    Проверяет, что callback_data - переход по страницам списка prefix.
+    """
+    return data.startswith(prefix + ':')
+
+
+def parse_page_callback(prefix, data):
+    """
+    Разбирает callback_data навигации: возвращает (курсор, backward).
+    Для входа в список и устаревших кнопок - первая страница.
+    """
+    args = decode_callback(data) if is_page_callback(prefix, data) else None
+    if args is None:
+        return None, False
+    direction, position = args
+    return position, direction == 'p'
+
+
+def activities_keyboard(prefix, make_button, data, back_callback=None,
+                        limit=PAGE_SIZE, start=None, confirmed=True):
+    """
+    Строит страницу списка мероприятий.
+    make_button(event) возвращает кнопку мероприятия, data - callback_data
+    нажатой кнопки (вход в список или переход по страницам).
+    Возвращает (страница ActivityPage, клавиатура).
+    """
+    cursor, backward = parse_page_callback(prefix, data)
+    page = store.activities_page(cursor, backward, limit, start, confirmed)
+
+    markup = InlineKeyboardMarkup(row_width=1)
+    for event in page.items:
+        markup.add(make_button(event))
+
+    nav_buttons = []
+    if page.before is not None:
+        nav_buttons.append(InlineKeyboardButton("⬅️ Назад", callback_data=page_callback(prefix, 'p', page.before)))
+    if page.after is not None:
+        nav_buttons.append(InlineKeyboardButton("➡️ Вперёд", callback_data=page_callback(prefix, 'n', page.after)))
+    markup.add(*nav_buttons)
+
+    if back_callback is not None:
+        markup.add(InlineKeyboardButton("Назад", callback_data=back_callback))
+    return page, markup
+
@@ -0,0 +1,157 @@
+# leaderboard.py
+"""
+Модуль с рейтингом студентов по подтверждённым достижениям.
+Каждое достижение приносит баллы: вес уровня мероприятия, умноженный
+на вес занятого места. Рейтинг подписан на изменения хранилища
+(DataStore.add_listener) и поддерживает отсортированные списки
+пар (-баллы, id студента) - общий и по каждой группе. Изменение
+достижения сдвигает в списках одного студента (O(log n) на поиск),
+поэтому «топ N» - это срез списка, а «моё место» - бинарный поиск.
+"""
+
+from bisect import bisect_left, insort
+
+from data_manager import store, parse_place
+
+# Начала названий уровней мероприятий и их веса
+LEVEL_WEIGHTS = (
+    ('локальн', 1),
+    ('регион', 2),
+    ('всеросс', 3),
+    ('международ', 4),
+)
+DEFAULT_LEVEL_WEIGHT = 1
+
+# Веса призовых мест; участие без призового места - DEFAULT_PLACE_WEIGHT
+PLACE_WEIGHTS = {1: 5, 2: 3, 3: 2}
+DEFAULT_PLACE_WEIGHT = 1
+
+
+def level_weight(level):
+    text = str(level or '').strip().lower()
+    for prefix, weight in LEVEL_WEIGHTS:
+        if text.startswith(prefix):
+            return weight
+    return DEFAULT_LEVEL_WEIGHT
+
+
+def achievement_points(achievement, event):
+    """
+    Баллы за подтверждённое достижение на мероприятии.
+    """
+    place_weight = PLACE_WEIGHTS.get(parse_place(achievement.get('place')), DEFAULT_PLACE_WEIGHT)
+    return level_weight(event.get('event_level')) * place_weight
+
+
+def _group_key(student):
+    return str(student.get('group_number') or '').strip().upper()
+
+
+class Leaderboard:
+    """
+    Рейтинг студентов, обновляемый вместе с хранилищем.
+    В рейтинге только студенты с положительным числом баллов.
+    """
+
+    def __init__(self):
+        self.store = None
+        self._reset()
+
+    def _reset(self):
+        self._scores = {}  # id студента -> баллы
+        self._groups = {}  # id студента -> группа, в списке которой он стоит
+        self._overall = []  # отсортированные (-баллы, id студента)
+        self._by_group = {}  # группа -> отсортированные (-баллы, id студента)
+        self._points = {}  # id достижения -> (id студента, баллы)
+
+    # --- Подписка на хранилище ---
+
+    def rebuild(self, store):
+        self.store = store
+        self._reset()
+        for achievement in store.achievements:
+            self._refresh_achievement(achievement['id'], achievement)
+
+    def changed(self, kind, key, record):
+        if kind == 'achievement':
+            self._refresh_achievement(key, record)
+        elif kind == 'activity':
+            # Уровень или само мероприятие могли измениться
+            for achievement in self.store.achievements_for_event(key):
+                self._refresh_achievement(achievement['id'], achievement)
+        elif kind == 'student' and key in self._scores and record is not None:
+            if _group_key(record) != self._groups[key]:
+                score = self._scores[key]
+                self._unrank(key)
+                self._rank(key, score)
+
+    def _refresh_achievement(self, key, achievement):
+        old = self._points.pop(key, None)
+        if old is not None:
+            self._add_points(*old, sign=-1)
+        if achievement is None or not achievement.get('confirmed', False):
+            return
+        event = self.store.get_activity(achievement['event_id'])
+        if event is None:
+            return
+        contribution = (str(achievement['student_id']), achievement_points(achievement, event))
+        self._points[key] = contribution
+        self._add_points(*contribution)
+
+    def _add_points(self, student_id, points, sign=1):
+        score = self._scores.get(student_id, 0)
+        if score:
+            self._unrank(student_id)
+        score += sign * points
+        if score > 0:
+            self._rank(student_id, score)
+
+    def _rank(self, student_id, score):
+        student = self.store.get_student(student_id) or {}
+        group = _group_key(student)
+        self._scores[student_id] = score
+        self._groups[student_id] = group
+        insort(self._overall, (-score, student_id))
+        insort(self._by_group.setdefault(group, []), (-score, student_id))
+
+    def _unrank(self, student_id):
+        score = self._scores.pop(student_id)
+        group = self._groups.pop(student_id)
+        entry = (-score, student_id)
+        del self._overall[bisect_left(self._overall, entry)]
+        ranking = self._by_group[group]
+        del ranking[bisect_left(ranking, entry)]
+        if not ranking:
+            del self._by_group[group]
+
+    # --- Чтение ---
+    # Читатели не берут блокировку: срез и бинарный поиск по списку
+    # пар выполняются целиком под GIL.
+
+    def _ranking(self, group):
+        if group is None:
+            return self._overall
+        return self._by_group.get(_group_key({'group_number': group}), [])
+
+    def top(self, limit=10, group=None):
+        """
+        Возвращает до limit пар (id студента, баллы) по убыванию баллов,
+        в общем рейтинге или в рейтинге группы.
+        """
+        return [(student_id, -score) for score, student_id in self._ranking(group)[:limit]]
+
+    def rank(self, student_id, group=None):
+        """
+        Возвращает (место, число студентов в рейтинге, баллы) или None,
+        если у студента нет баллов. Студенты с равными баллами делят место.
+        """
+        student_id = str(student_id)
+        score = self._scores.get(student_id)
+        if score is None:
+            return None
+        ranking = self._ranking(group)
+        return bisect_left(ranking, (-score,)) + 1, len(ranking), score
+
+
+leaderboard = Leaderboard()
+store.add_listener(leaderboard)
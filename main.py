@@ -2,17 +2,52 @@
 """
 Точка входа в приложение.
 Создает экземпляр бота и запускает его, а также планировщик задач.
+Бот получает обновления long polling'ом или через вебхук (BOT_MODE=webhook).
 """
 
-from bot_instance import bot
+import signal
+import sys
+from bot_instance import bot, dispatcher, pdf_renderer
+from config import BOT_MODE, WEBHOOK_URL, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET
+from data_manager import store
 from schedule_manager import start_scheduler
+from webhook_server import WebhookServer
 
 # Импорт всех файлов с обработчиками
 import handlers.main_handlers
 import handlers.registration
 import handlers.statistics
 import handlers.events
+import handlers.leaderboard
+
+def run_webhook():
+    """
+    Запускает HTTP-сервер вебхука и регистрирует вебхук в Telegram,
+    если задан публичный адрес WEBHOOK_URL.
+    """
+    server = WebhookServer(dispatcher, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_PATH, secret=WEBHOOK_SECRET)
+    if WEBHOOK_URL:
+        bot.set_webhook(url=WEBHOOK_URL.rstrip('/') + WEBHOOK_PATH, secret_token=WEBHOOK_SECRET)
+    try:
+        server.serve_forever()
+    finally:
+        server.shutdown()
 
 if __name__ == '__main__':
+    # SIGTERM превращаем в обычный выход, чтобы сработал finally ниже
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    pdf_renderer.start()  # Процессы PDF запускаются раньше остальных потоков
     start_scheduler()  # Запуск планировщика случайных сообщений
-    bot.polling(none_stop=True)
+    dispatcher.start()  # Запуск потоков-обработчиков обновлений
+    try:
+        if BOT_MODE == 'webhook':
+            run_webhook()
+        else:
+            bot.polling(none_stop=True)
+    finally:
+        # Дорабатываем уже принятые обновления
+        dispatcher.stop()
+        # Досылаем PDF-отчёты, поставленные в очередь
+        pdf_renderer.stop()
+        # Барьер сохранности: отложенные изменения записываются до выхода
+        store.close()
@@ -0,0 +1,84 @@
+# menus.py
+"""
+Модуль со статическими меню бота.
+Меню описаны таблицей MENUS в ru.py. Клавиатура каждого меню собирается
+и сериализуется в JSON один раз - при запуске или по команде
+/reload_texts, - а не при каждом показе: обработчики отдают Telegram
+уже готовую строку.
+
+    screen = get_menu("statistics")
+    show_screen(bot, call, screen.text, screen.markup)
+"""
+
+import importlib
+from collections import namedtuple
+
+from telebot.types import InlineKeyboardMarkup, InlineKeyboardButton, JsonSerializable
+
+import ru
+
+Menu = namedtuple('Menu', 'text markup')
+
+
+class PrebuiltMarkup(JsonSerializable):
+    """
+    Клавиатура, сериализованная заранее.
+    Передаётся в reply_markup вместо InlineKeyboardMarkup.
+    """
+
+    def __init__(self, markup):
+        self.json = markup.to_json()
+
+    def to_json(self):
+        return self.json
+
+
+def build_markup(buttons):
+    """
+    Собирает клавиатуру по списку (надпись, callback_data), по кнопке в ряд.
+    """
+    markup = InlineKeyboardMarkup(row_width=1)
+    markup.add(*(InlineKeyboardButton(label, callback_data=data) for label, data in buttons))
+    return PrebuiltMarkup(markup)
+
+
+def build_menus(table):
+    """
+    Собирает все меню таблицы ru.MENUS.
+    """
+    return {name: Menu(text, build_markup(buttons)) for name, (text, buttons) in table.items()}
+
+
+_menus = build_menus(ru.MENUS)
+_back_markups = {}
+
+
+def get_menu(name):
+    """
+    Возвращает меню (текст, клавиатура) по имени.
+    """
+    return _menus[name]
+
+
+def back_markup(callback_data):
+    """
+    Возвращает клавиатуру из одной кнопки «Назад» с данным callback_data.
+    """
+    markup = _back_markups.get(callback_data)
+    if markup is None:
+        markup = _back_markups[callback_data] = build_markup([(ru.BACK_BUTTON_TEXT, callback_data)])
+    return markup
+
+
+def reload_texts():
+    """
+    Перечитывает ru.py и пересобирает меню.
+    Новые таблицы подменяются целиком, поэтому обработчики в других
+    потоках видят либо старые, либо новые меню, но не смесь.
+    Возвращает число меню.
+    """
+    global _menus, _back_markups
+    module = importlib.reload(ru)
+    menus = build_menus(module.MENUS)
+    _menus, _back_markups = menus, {}
+    return len(menus)
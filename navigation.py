@@ -0,0 +1,25 @@
+# navigation.py
+"""
+Модуль для переходов между экранами меню.
+Экран, открытый нажатием inline-кнопки, показывается на месте сообщения
+с этой кнопкой (edit_message_text): один запрос к Telegram вместо
+delete_message + send_message, и чат не засоряется старыми меню.
+"""
+
+from telebot.apihelper import ApiTelegramException
+
+
+def show_screen(bot, call, text, reply_markup=None):
+    """
+    Заменяет сообщение с нажатой кнопкой новым экраном.
+    Если сообщение отредактировать нельзя (слишком старое, без текста,
+    например документ), экран отправляется новым сообщением.
+    """
+    chat_id = call.message.chat.id
+    try:
+        return bot.edit_message_text(text, chat_id, call.message.message_id, reply_markup=reply_markup)
+    except ApiTelegramException as e:
+        if 'message is not modified' in e.description:
+            # Повторное нажатие той же кнопки - экран уже на месте
+            return call.message
+        return bot.send_message(chat_id, text, reply_markup=reply_markup)
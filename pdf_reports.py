@@ -0,0 +1,195 @@
+# pdf_reports.py
+"""
+Модуль для фоновой генерации PDF-отчётов «Скачать PDF».
+Отчёты рисуются в пуле процессов, чтобы не занимать потоки-обработчики
+обновлений. Каждый процесс разбирает файл шрифта один раз: готовый
+документ со шрифтом хранится как шаблон, а для отчёта берётся его копия.
+Пока отчёт пользователя в работе, повторные нажатия не ставят новый.
+Готовые документы отправляет отдельный поток.
+"""
+
+import copy
+import io
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from fpdf import FPDF
+from fpdf.enums import XPos, YPos
+
+from config import PDF_WORKERS, PDF_QUEUE_SIZE
+
+FONT_PATH = os.path.join(os.path.dirname(__file__), 'handlers', 'fonts', 'DejaVuSans.ttf')
+
+# Результат постановки отчёта в очередь
+PDF_QUEUED = 'queued'
+PDF_DUPLICATE = 'duplicate'  # отчёт этого пользователя уже в работе
+PDF_BUSY = 'busy'  # очередь заполнена
+
+# Шаблон документа со шрифтом, свой в каждом процессе пула
+_template = None
+
+
+def _template_pdf():
+    """
+    Возвращает шаблон документа с подключённым шрифтом,
+    при первом вызове в процессе разбирает файл шрифта.
+    """
+    global _template
+    if _template is None:
+        if not os.path.exists(FONT_PATH):
+            raise FileNotFoundError(f"Шрифт не найден: {FONT_PATH}")
+        pdf = FPDF()
+        # Шрифт с поддержкой кириллицы (нужен файл DejaVuSans.ttf в handlers/fonts)
+        pdf.add_font('DejaVu', '', FONT_PATH)
+        _template = pdf
+    return _template
+
+
+def warm_up():
+    """
+    Заранее загружает шрифт в процессе пула.
+    """
+    try:
+        _template_pdf()
+    except Exception as e:
+        print(f"Ошибка при загрузке шрифта для PDF: {e}")
+
+
+def render_events_pdf(events):
+    """
+    Рисует PDF со списком мероприятий. Возвращает байты документа.
+    """
+    pdf = copy.deepcopy(_template_pdf())
+    pdf.add_page()
+    pdf.set_font('DejaVu', '', 12)
+
+    pdf.cell(200, 10, text="Ваши мероприятия", new_x=XPos.LMARGIN, new_y=YPos.NEXT, align='C')
+
+    for event in events:
+        title = event.get('title', 'Без названия')
+        description = event.get('description', 'Описание отсутствует')
+        date = event.get('date', 'Дата не указана')
+        level = event.get('event_level', 'Не указан')
+        category = event.get('event_category', 'Не указана')
+
+        text = (
+            f"Название: {title}\n"
+            f"Описание: {description}\n"
+            f"Дата: {date}\n"
+            f"Уровень: {level}\n"
+            f"Категория: {category}\n\n"
+        )
+        pdf.multi_cell(0, 10, text=text, new_x=XPos.LMARGIN, new_y=YPos.NEXT)
+
+    return bytes(pdf.output())
+
+
+class PdfRenderer:
+    """
+    Очередь PDF-отчётов: пул процессов для отрисовки
+    и поток для отправки готовых документов.
+    Не больше одного отчёта на пользователя и max_pending на всех.
+    """
+
+    def __init__(self, bot, workers=PDF_WORKERS, max_pending=PDF_QUEUE_SIZE):
+        self.bot = bot
+        self.workers = workers
+        self.max_pending = max_pending
+        self._executor = None
+        self._executor_lock = threading.Lock()
+        self._pending = set()  # telegram_id пользователей с отчётом в работе
+        self._lock = threading.Lock()
+        self._ready = queue.Queue()
+        self._thread = None
+
+    def start(self):
+        """
+        Запускает процессы пула и поток отправки.
+        Вызывается до запуска остальных потоков бота: там, где процессы
+        создаются fork'ом, они создаются, пока в программе один поток.
+        """
+        self._executor = self._create_executor()
+        self._thread = threading.Thread(target=self._deliver, daemon=True)
+        self._thread.start()
+
+    def _create_executor(self):
+        """
+        Создаёт пул процессов со способом запуска по умолчанию
+        для платформы (fork в Linux, spawn в Windows и macOS).
+        """
+        executor = ProcessPoolExecutor(max_workers=self.workers)
+        # Первая задача запускает все процессы пула
+        executor.submit(warm_up).result()
+        return executor
+
+    def _submit_render(self, events):
+        """
+        Отдаёт отчёт пулу. Сломанный пул (процесс упал) пересоздаётся.
+        """
+        with self._executor_lock:
+            try:
+                return self._executor.submit(render_events_pdf, events)
+            except BrokenProcessPool:
+                print("Пул процессов PDF сломан, создаём заново")
+                self._executor.shutdown(wait=False)
+                self._executor = self._create_executor()
+                return self._executor.submit(render_events_pdf, events)
+
+    def stop(self):
+        """
+        Дожидается уже поставленных отчётов и их отправки.
+        """
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=True)
+        self._ready.put(None)
+        self._thread.join()
+
+    def submit(self, telegram_id, chat_id, events):
+        """
+        Ставит отчёт пользователя в очередь.
+        Возвращает PDF_QUEUED, PDF_DUPLICATE или PDF_BUSY.
+        """
+        with self._lock:
+            if telegram_id in self._pending:
+                return PDF_DUPLICATE
+            if len(self._pending) >= self.max_pending:
+                return PDF_BUSY
+            self._pending.add(telegram_id)
+        try:
+            future = self._submit_render(events)
+        except Exception as e:
+            # Иначе пользователь больше не смог бы запросить отчёт
+            print(f"Не удалось поставить PDF в очередь: {e}")
+            with self._lock:
+                self._pending.discard(telegram_id)
+            return PDF_BUSY
+        future.add_done_callback(lambda done: self._ready.put((telegram_id, chat_id, done)))
+        return PDF_QUEUED
+
+    def _deliver(self):
+        while True:
+            item = self._ready.get()
+            if item is None:
+                return
+            telegram_id, chat_id, future = item
+            try:
+                pdf_file = io.BytesIO(future.result())
+                pdf_file.name = "my_events.pdf"
+                self.bot.send_document(
+                    chat_id=chat_id,
+                    document=pdf_file,
+                    caption="Список ваших мероприятий"
+                )
+            except Exception as e:
+                print(f"Ошибка при генерации PDF: {e}")
+                try:
+                    self.bot.send_message(chat_id, "Произошла ошибка при генерации отчета.")
+                except Exception as send_error:
+                    print(f"Не удалось сообщить об ошибке пользователю {telegram_id}: {send_error}")
+            finally:
+                with self._lock:
+                    self._pending.discard(telegram_id)
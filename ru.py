@@ -6,6 +6,52 @@
 
 
 WELCOME_TEXT = "Выберите один из вариантов ниже👇:"
+STATISTICS_TEXT = "Что делаем в этот раз?"
+EVENTS_MENU_TEXT = "Так, куда дальше? Выбирай ниже 👇"
+ADMIN_MENU_TEXT = "Выберите действие:"
+LEADERBOARD_TEXT = "Рейтинг студентов"
+GROUP_LEADERBOARD_TEXT = "Рейтинг группы {group}"
+BACK_BUTTON_TEXT = "Назад"
+
+# Статические меню: имя -> (текст, [(надпись кнопки, callback_data), ...]).
+# Клавиатуры собираются один раз (см. menus.py); после правки файла
+# админ может перечитать его командой /reload_texts без перезапуска бота.
+MENUS = {
+    "welcome": (WELCOME_TEXT, [
+        ("Моя статистика", "my_statistics"),
+        ("Известные мероприятия", "upcoming_events"),
+    ]),
+    "statistics": (STATISTICS_TEXT, [
+        ("Похвастаться", "show_achievements"),
+        ("Мои мероприятия", "my_events"),
+        ("Информация обо мне", "my_info"),
+        ("Рейтинг", "leaderboard"),
+        ("Изменить информацию о себе", "edit_info"),
+        (BACK_BUTTON_TEXT, "back_to_options"),
+    ]),
+    "leaderboard": (LEADERBOARD_TEXT, [
+        ("Рейтинг моей группы", "leaderboard_group"),
+        (BACK_BUTTON_TEXT, "back_to_statistics"),
+    ]),
+    "leaderboard_group": (GROUP_LEADERBOARD_TEXT, [
+        (BACK_BUTTON_TEXT, "leaderboard"),
+    ]),
+    "events": (EVENTS_MENU_TEXT, [
+        ("Узнать о предстоящих мероприятиях", "get_events"),
+        ("Сообщить о мероприятии", "report_event"),
+        (BACK_BUTTON_TEXT, "back_to_welcome"),
+    ]),
+    "admin": (ADMIN_MENU_TEXT, [
+        ("Добавить администратора", "view_students:0"),
+        ("Подтвердить мероприятия", "approve_events"),
+        ("Подтвердить достижения студента", "approve_student_achievements"),
+        ("Редактировать мероприятия", "edit_events"),
+        ("Выгрузка по мероприятиям", "export_event_data"),
+        ("Выгрузка пользователей и их достижения", "export_users_and_achievements"),
+        ("Статистика", "admin_stats"),
+    ]),
+}
+
 RAND_MESSAGES = [
     "Привет, {name}! Участвовал(а) в мероприятии на этой неделе? Поделись своими впечатлениями! 😊",
     "Напоминаем, что скоро пройдет важное событие! Не забудь зарегистрироваться, {name}! 🚀",
@@ -8,25 +8,36 @@ import schedule
 import time
 import threading
 import random
-from data_manager import load_data
-from ru import RAND_MESSAGES
+from data_manager import store
+import ru
 from bot_instance import bot
+from broadcast_manager import Broadcaster, classify_error, log_progress
+from conversation_manager import conversations
+from callback_codec import callbacks
+
+broadcaster = Broadcaster(bot)
 
 def send_random_messages():
     """
-    Отправляет случайное сообщение каждому зарегистрированному пользователю.
-    Если бот заблокирован, ошибка перехватывается и логируется.
+    Отправляет случайное сообщение каждому доступному пользователю.
+    Рассылка идёт параллельно с соблюдением лимитов Telegram;
+    ошибки отправки собираются и логируются по каждому пользователю.
+    Пользователи, заблокировавшие бота или удалившие аккаунт, помечаются
+    и в следующие рассылки не попадают, пока снова не нажмут /start.
     """
-    data = load_data()
-    for student in data.get('students', []):
-        telegram_id = student.get('telegram_id')
-        first_name = student.get('first_name', '')
-        random_message = random.choice(RAND_MESSAGES).format(name=first_name)
-        try:
-            bot.send_message(telegram_id, random_message)
-        except Exception as e:
+    messages = [
+        (student['telegram_id'], random.choice(ru.RAND_MESSAGES).format(name=student.get('first_name', '')))
+        for student in store.reachable_students()
+    ]
+    result = broadcaster.broadcast(messages, progress=log_progress)
+    with store.transaction() as tx:
+        for telegram_id, error in result.failed.items():
             # Логируем ошибку, чтобы понять, к какому пользователю проблема
-            print(f"Не удалось отправить сообщение пользователю {telegram_id}: {e}")
+            print(f"Не удалось отправить сообщение пользователю {telegram_id}: {error}")
+            status = classify_error(error)
+            if status is not None:
+                tx.update_student(telegram_id, delivery_status=status)
+    print(f"Рассылка завершена: отправлено {result.sent} из {result.total}")
 
 def run_schedule():
     """
@@ -41,4 +52,6 @@ def start_scheduler():
     Инициализирует планировщик и запускает его в отдельном потоке.
     """
     schedule.every(3).days.do(send_random_messages)
+    schedule.every(10).minutes.do(conversations.evict_expired)  # Очистка брошенных диалогов
+    schedule.every(10).minutes.do(callbacks.evict_expired)  # Очистка устаревших токенов кнопок
     threading.Thread(target=run_schedule, daemon=True).start()
@@ -0,0 +1,273 @@
+# sqlite_backend.py
+"""
+Бэкенд хранения данных в SQLite.
+Каждая коллекция базы лежит в своей таблице, база работает в режиме WAL.
+Запросы бота обслуживают индексы DataStore в памяти: при запуске таблицы
+читаются целиком, поэтому собственных индексов SQLite у таблиц нет. Операции хранилища DataStore превращаются
+в построчные INSERT/UPDATE/DELETE, поэтому запись не переписывает базу целиком.
+
+Поля записей, для которых в схеме нет отдельного столбца, хранятся
+в JSON-столбце extra и при чтении возвращаются в запись как обычные поля.
+
+Разовая миграция из JSON-базы:
+    python sqlite_backend.py [basa.json] [basa.sqlite3]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import uuid
+
+# Схема таблиц: (первичный ключ, [(столбец, тип), ...])
+SCHEMA = {
+    'students': ('telegram_id', [
+        ('telegram_id', 'INTEGER PRIMARY KEY'),
+        ('first_name', 'TEXT'),
+        ('last_name', 'TEXT'),
+        ('group_number', 'TEXT'),
+        ('delivery_status', 'TEXT'),
+    ]),
+    'activities': ('id', [
+        ('id', 'TEXT PRIMARY KEY'),
+        ('title', 'TEXT'),
+        ('description', 'TEXT'),
+        ('date', 'TEXT'),
+        ('location', 'TEXT'),
+        ('survey_link', 'TEXT'),
+        ('event_level', 'TEXT'),
+        ('event_category', 'TEXT'),
+        ('confirmed', 'BOOLEAN'),
+        ('submitter_id', 'INTEGER'),
+    ]),
+    'achievements': ('id', [
+        ('id', 'TEXT PRIMARY KEY'),
+        ('student_id', 'INTEGER'),
+        ('event_id', 'TEXT'),
+        ('place', 'TEXT'),
+        ('date', 'TEXT'),
+        ('confirmed', 'BOOLEAN'),
+    ]),
+    'admins': ('telegram_id', [
+        ('telegram_id', 'INTEGER PRIMARY KEY'),
+        ('first_name', 'TEXT'),
+        ('last_name', 'TEXT'),
+        ('group_number', 'TEXT'),
+    ]),
+}
+
+# Индексы, которые создавали прежние версии; при открытии базы удаляются
+OBSOLETE_INDEXES = (
+    'idx_achievements_student',
+    'idx_achievements_event',
+    'idx_achievements_pair',
+    'idx_activities_confirmed_date',
+)
+
+# Операции журнала DataStore: таблица и вид изменения
+OPERATIONS = {
+    'add_student': ('students', 'upsert'),
+    'update_student': ('students', 'update'),
+    'add_activity': ('activities', 'upsert'),
+    'update_activity': ('activities', 'update'),
+    'delete_activity': ('activities', 'delete'),
+    'add_achievement': ('achievements', 'upsert'),
+    'update_achievement': ('achievements', 'update'),
+    'add_admin': ('admins', 'insert'),
+}
+
+
+class SqliteBackend:
+    """
+    Хранение базы в SQLite.
+    Если файла базы ещё нет, а рядом лежит JSON-база migrate_from,
+    данные из неё переносятся автоматически при первом запуске.
+    Миграция идёт во временный файл, который занимает место базы
+    только после успешного переноса: прерванная миграция повторится
+    при следующем запуске, а не оставит пустую базу.
+    """
+
+    def __init__(self, filename, migrate_from=None):
+        self.filename = filename
+        if not os.path.exists(filename) and migrate_from and os.path.exists(migrate_from):
+            self._migrate_into_place(migrate_from)
+        # Запись идёт из разных потоков-обработчиков, но всегда
+        # под блокировкой записи DataStore
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")
+        self._ensure_schema()
+
+    def _migrate_into_place(self, migrate_from):
+        """
+        Переносит JSON-базу во временный файл и атомарно
+        переименовывает его в файл базы.
+        """
+        tmp_filename = self.filename + '.tmp'
+        # Остатки прерванной миграции
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(tmp_filename + suffix):
+                os.remove(tmp_filename + suffix)
+        target = SqliteBackend(tmp_filename)
+        try:
+            migrate_json(migrate_from, target)
+        finally:
+            # Закрытие последнего соединения переносит WAL в основной файл
+            target.close()
+        os.replace(tmp_filename, self.filename)
+        print(f"Данные из {migrate_from} перенесены в {self.filename}")
+
+    def _ensure_schema(self):
+        """
+        Создаёт таблицы, добавляет столбцы, появившиеся в схеме,
+        и удаляет ненужные индексы.
+        """
+        with self.conn:
+            for table, (_, columns) in SCHEMA.items():
+                definition = ", ".join(f"{name} {kind}" for name, kind in columns)
+                self.conn.execute(f"CREATE TABLE IF NOT EXISTS {table} ({definition}, extra TEXT)")
+                existing = {row[1] for row in self.conn.execute(f"PRAGMA table_info({table})")}
+                for name, kind in columns:
+                    if name not in existing:
+                        self.conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {kind}")
+            for index in OBSOLETE_INDEXES:
+                self.conn.execute(f"DROP INDEX IF EXISTS {index}")
+
+    # --- Преобразование записей ---
+
+    @staticmethod
+    def _split(table, record):
+        """
+        Делит запись на значения столбцов схемы и прочие поля (extra).
+        """
+        columns = {name for name, _ in SCHEMA[table][1]}
+        values = {key: value for key, value in record.items() if key in columns}
+        extra = {key: value for key, value in record.items() if key not in columns}
+        return values, extra
+
+    @staticmethod
+    def _decode(table, row):
+        """
+        Собирает запись из строки таблицы. Пустые столбцы пропускаются,
+        чтобы запись выглядела так же, как в JSON-базе.
+        """
+        record = {}
+        for (name, kind), value in zip(SCHEMA[table][1], row):
+            if value is None:
+                continue
+            record[name] = bool(value) if kind == 'BOOLEAN' else value
+        extra = row[-1]
+        if extra:
+            record.update(json.loads(extra))
+        return record
+
+    def _merge_extra(self, table, key, extra):
+        """
+        Объединяет новые поля extra с уже сохранёнными у записи.
+        """
+        key_column = SCHEMA[table][0]
+        row = self.conn.execute(f"SELECT extra FROM {table} WHERE {key_column} = ?", (key,)).fetchone()
+        merged = json.loads(row[0]) if row and row[0] else {}
+        merged.update(extra)
+        return json.dumps(merged, ensure_ascii=False)
+
+    # --- Интерфейс бэкенда ---
+
+    def load(self):
+        """
+        Читает все таблицы. Журнал для проигрывания у SQLite не нужен.
+        """
+        data = {}
+        for table, (_, columns) in SCHEMA.items():
+            names = ", ".join(name for name, _ in columns)
+            rows = self.conn.execute(f"SELECT {names}, extra FROM {table} ORDER BY rowid")
+            data[table] = [self._decode(table, row) for row in rows]
+        return data, []
+
+    def write(self, entries):
+        """
+        Применяет операции одной транзакцией SQLite.
+        """
+        with self.conn:
+            for entry in entries:
+                self._execute(entry)
+
+    def _insert(self, table, record, replace):
+        """
+        Вставляет запись; при конфликте ключа обновляет переданные поля
+        (replace=True) или оставляет существующую запись.
+        """
+        key_column = SCHEMA[table][0]
+        values, extra = self._split(table, record)
+        if extra:
+            values['extra'] = self._merge_extra(table, values[key_column], extra)
+        names = ", ".join(values)
+        placeholders = ", ".join("?" for _ in values)
+        if replace:
+            conflict = "DO UPDATE SET " + ", ".join(f"{name} = excluded.{name}" for name in values)
+        else:
+            conflict = "DO NOTHING"
+        self.conn.execute(
+            f"INSERT INTO {table} ({names}) VALUES ({placeholders}) "
+            f"ON CONFLICT({key_column}) {conflict}",
+            list(values.values())
+        )
+
+    def _execute(self, entry):
+        table, kind = OPERATIONS[entry['op']]
+        key_column = SCHEMA[table][0]
+
+        if kind in ('upsert', 'insert'):
+            self._insert(table, entry['record'], replace=kind == 'upsert')
+        elif kind == 'update':
+            key = entry[key_column]
+            values, extra = self._split(table, entry['fields'])
+            if extra:
+                values['extra'] = self._merge_extra(table, key, extra)
+            if values:
+                assignments = ", ".join(f"{name} = ?" for name in values)
+                self.conn.execute(
+                    f"UPDATE {table} SET {assignments} WHERE {key_column} = ?",
+                    [*values.values(), key]
+                )
+        elif kind == 'delete':
+            self.conn.execute(f"DELETE FROM {table} WHERE {key_column} = ?", (entry[key_column],))
+
+    def needs_compaction(self):
+        return False
+
+    def compact(self, data):
+        """
+        Полностью перезаписывает таблицы данными из памяти одной транзакцией.
+        """
+        with self.conn:
+            for table in SCHEMA:
+                self.conn.execute(f"DELETE FROM {table}")
+                for record in data.get(table, []):
+                    self._insert(table, record, replace=True)
+
+    def close(self):
+        self.conn.close()
+
+
+def migrate_json(json_filename, backend):
+    """
+    Переносит JSON-базу (снимок и журнал) в SQLite.
+    Исходные файлы открываются только для чтения и не меняются.
+    """
+    from data_manager import DataStore, ReadOnlyJsonBackend
+
+    source = DataStore(ReadOnlyJsonBackend(json_filename))
+    for achievement in source.achievements:
+        achievement.setdefault('id', str(uuid.uuid4()))
+    backend.compact(source.data)
+    source.close()
+
+
+if __name__ == '__main__':
+    json_filename = sys.argv[1] if len(sys.argv) > 1 else 'basa.json'
+    sqlite_filename = sys.argv[2] if len(sys.argv) > 2 else 'basa.sqlite3'
+    target = SqliteBackend(sqlite_filename)
+    migrate_json(json_filename, target)
+    target.close()
+    print(f"Данные из {json_filename} перенесены в {sqlite_filename}")
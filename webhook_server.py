@@ -0,0 +1,129 @@
+# webhook_server.py
+"""
+Модуль для работы бота в режиме вебхука.
+Встроенный HTTP-сервер принимает POST-запросы Telegram с обновлениями,
+проверяет секретный токен из заголовка X-Telegram-Bot-Api-Secret-Token
+и передаёт обновления диспетчеру (см. dispatcher.py), полосы которого
+и выполняют хендлеры бота. Если очередь полосы заполнена, сервер отвечает
+503 и Telegram повторит доставку позже - так нагрузка не копится в памяти бота.
+GET-запрос на <WEBHOOK_PATH>/metrics с тем же заголовком секрета
+возвращает метрики полос в JSON. Без WEBHOOK_SECRET сервер не запускается.
+
+Для локальной проверки достаточно запустить бота с BOT_MODE=webhook
+без WEBHOOK_URL и отправить сохранённое обновление:
+    curl -X POST -H "X-Telegram-Bot-Api-Secret-Token: <секрет>" \\
+         -d @update.json http://localhost:8443/webhook
+"""
+
+import hmac
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from telebot.types import Update
+
+SECRET_HEADER = 'X-Telegram-Bot-Api-Secret-Token'
+
+
+class WebhookServer:
+    """
+    HTTP-сервер вебхука, передающий обновления диспетчеру.
+    """
+
+    def __init__(self, dispatcher, host, port, path, secret):
+        if not secret:
+            raise ValueError("Для режима вебхука нужно задать WEBHOOK_SECRET")
+        self.dispatcher = dispatcher
+        self.path = path
+        self.secret = secret
+        self.httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self.httpd.daemon_threads = True
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                try:
+                    length = int(self.headers['Content-Length'])
+                except TypeError:  # заголовка нет
+                    status = 411
+                except ValueError:
+                    status = 400
+                else:
+                    if length < 0:
+                        status = 400
+                    else:
+                        status = server.accept(self.path, self.headers, self.rfile.read(length))
+                self.send_response(status)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+
+            def do_GET(self):
+                if self.path != server.path + '/metrics':
+                    self.send_error(404)
+                    return
+                if not server.authorized(self.headers):
+                    self.send_error(403)
+                    return
+                body = json.dumps(server.dispatcher.stats()).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                # Не засоряем вывод строкой на каждый запрос
+                pass
+
+        return Handler
+
+    def authorized(self, headers):
+        """
+        Проверяет секретный токен запроса. Сравнение за постоянное время,
+        чтобы секрет нельзя было подобрать по времени ответа.
+        """
+        token = headers.get(SECRET_HEADER) or ''
+        return hmac.compare_digest(token.encode('utf-8'), self.secret.encode('utf-8'))
+
+    def accept(self, path, headers, body):
+        """
+        Проверяет запрос и передаёт обновление диспетчеру.
+        Возвращает HTTP-код ответа.
+        """
+        if path != self.path:
+            return 404
+        if not self.authorized(headers):
+            return 403
+        # JSONDecodeError и UnicodeDecodeError - подклассы ValueError;
+        # KeyError/TypeError - JSON, не похожий на Update
+        try:
+            update = Update.de_json(json.loads(body))
+        except (ValueError, KeyError, TypeError):
+            return 400
+        if update is None:
+            return 400
+        if not self.dispatcher.submit(update, block=False):
+            return 503
+        return 200
+
+    def start(self):
+        """
+        Запускает HTTP-сервер в фоновом потоке.
+        """
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def serve_forever(self):
+        """
+        Обслуживает запросы в текущем потоке.
+        """
+        self.httpd.serve_forever()
+
+    def shutdown(self):
+        """
+        Останавливает приём запросов. Принятые обновления
+        дорабатывает диспетчер (ChatDispatcher.stop).
+        """
+        self.httpd.shutdown()
+        self.httpd.server_close()